@@ -0,0 +1,317 @@
+import asyncio
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from batch import Overloaded
+from metrics import ADMISSION_REJECTED, observe_phase
+
+logger = logging.getLogger("briefing.admission")
+
+
+@dataclass
+class Limit:
+    """Token bucket: `burst` requests at once, refilled at `rate` per second."""
+    rate: float
+    burst: float
+
+
+def _refill(tokens: float, updated: float, now: float, limit: Limit) -> float:
+    return min(limit.burst, tokens + (now - updated) * limit.rate)
+
+
+class MemoryAdmissionStore:
+    """Admission state of a single process."""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._slots: Dict[str, float] = {}
+        self._takes = 0
+
+    async def take(self, key: str, limit: Limit, cost: float = 1) -> float:
+        """Spend `cost` tokens of bucket `key`. Returns 0 when allowed,
+        otherwise the seconds until enough tokens are available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (limit.burst, now))
+        tokens = _refill(tokens, updated, now, limit)
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / limit.rate if limit.rate > 0 else math.inf
+        self._buckets[key] = (tokens - cost, now)
+        self._takes += 1
+        if self._takes % 1000 == 0:
+            # Idle buckets are full again; forgetting them changes nothing
+            idle = now - 3600
+            self._buckets = {k: v for k, v in self._buckets.items() if v[1] > idle}
+        return 0.0
+
+    async def try_acquire(self, limit: int, ttl: float) -> Optional[str]:
+        """Take one of `limit` concurrency slots, held at most `ttl` seconds."""
+        now = time.monotonic()
+        self._slots = {token: expires for token, expires in self._slots.items() if expires > now}
+        if len(self._slots) >= limit:
+            return None
+        token = uuid.uuid4().hex
+        self._slots[token] = now + ttl
+        return token
+
+    async def release(self, token: str):
+        self._slots.pop(token, None)
+
+
+class SQLiteAdmissionStore:
+    """Admission state in a SQLite file shared by every uvicorn worker on the
+    host, so limits hold for the whole server rather than per process.
+    Slots expire after their ttl, so a crashed worker cannot leak them."""
+
+    def __init__(self, path: str = "admission.db"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.executescript("""
+            pragma journal_mode = wal;
+            -- Losing this state on a crash only resets the limits
+            pragma synchronous = off;
+            create table if not exists buckets (key text primary key, tokens real not null, updated real not null);
+            create table if not exists slots (token text primary key, expires real not null);
+        """)
+        self._takes = 0
+
+    async def take(self, key: str, limit: Limit, cost: float = 1) -> float:
+        return await asyncio.to_thread(self._take, key, limit, cost)
+
+    def _take(self, key: str, limit: Limit, cost: float) -> float:
+        # Wall clock, unlike the in-memory store: it is compared across processes
+        now = time.time()
+        with self._lock:
+            self._conn.execute("begin immediate")
+            try:
+                row = self._conn.execute("select tokens, updated from buckets where key = ?", (key,)).fetchone()
+                tokens = _refill(*row, now, limit) if row else limit.burst
+                wait = 0.0
+                if tokens < cost:
+                    wait = (cost - tokens) / limit.rate if limit.rate > 0 else math.inf
+                else:
+                    tokens -= cost
+                self._conn.execute(
+                    "insert into buckets (key, tokens, updated) values (?, ?, ?)"
+                    " on conflict (key) do update set tokens = excluded.tokens, updated = excluded.updated",
+                    (key, tokens, now)
+                )
+                self._takes += 1
+                if self._takes % 1000 == 0:
+                    self._conn.execute("delete from buckets where updated < ?", (now - 3600,))
+                self._conn.execute("commit")
+            except BaseException:
+                self._conn.execute("rollback")
+                raise
+        return wait
+
+    async def try_acquire(self, limit: int, ttl: float) -> Optional[str]:
+        return await asyncio.to_thread(self._try_acquire, limit, ttl)
+
+    def _try_acquire(self, limit: int, ttl: float) -> Optional[str]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("begin immediate")
+            try:
+                self._conn.execute("delete from slots where expires <= ?", (now,))
+                (held,) = self._conn.execute("select count(*) from slots").fetchone()
+                if held >= limit:
+                    self._conn.execute("commit")
+                    return None
+                self._conn.execute("insert into slots (token, expires) values (?, ?)", (token, now + ttl))
+                self._conn.execute("commit")
+            except BaseException:
+                self._conn.execute("rollback")
+                raise
+        return token
+
+    async def release(self, token: str):
+        await asyncio.to_thread(self._release, token)
+
+    def _release(self, token: str):
+        with self._lock:
+            self._conn.execute("delete from slots where token = ?", (token,))
+
+
+async def request_identity(request: Request) -> str:
+    """Who a request is charged to: its API key, else the user_id in the path
+    or JSON body, else the client address."""
+    api_key = request.headers.get("x-api-key")
+    authorization = request.headers.get("authorization", "")
+    if not api_key and authorization.lower().startswith("bearer "):
+        api_key = authorization[7:].strip()
+    if api_key:
+        # Keys are hashed so they never end up in the store or the logs
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    user_id = request.path_params.get("user_id")
+    if user_id is None and request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            # Starlette caches the body, so the endpoint can still read it
+            body = await request.json()
+        except ValueError:
+            body = None
+        if isinstance(body, dict) and isinstance(body.get("user_id"), str):
+            user_id = body["user_id"]
+    if user_id:
+        return "user:" + user_id
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+class AdmissionController:
+    """Decides whether a request may proceed.
+
+    Each endpoint group has a token bucket per caller. Every upstream model
+    call also needs one of `max_concurrency` global slots (sized to the
+    upstream quota), whether it comes from a request, a batch item or a
+    background job; a call waits at most `queue_target` seconds for one.
+    When more than `shed_threshold` of recent waits timed out, calls that
+    find no free slot are shed at once with 503 and Retry-After instead of
+    joining the queue.
+    """
+
+    def __init__(
+        self,
+        store,
+        limits: Dict[str, Limit],
+        max_concurrency: int = 32,
+        queue_target: float = 5.0,
+        slot_ttl: float = 300,
+        poll_interval: float = 0.05,
+        shed_threshold: float = 0.5
+    ):
+        self.store = store
+        self.limits = limits
+        self.max_concurrency = max_concurrency
+        self.queue_target = queue_target
+        self.slot_ttl = slot_ttl
+        self.poll_interval = poll_interval
+        self.shed_threshold = shed_threshold
+        # Moving share of slot waits that ended in a timeout. Waits are capped
+        # at queue_target, so their average could never exceed the target.
+        self.timeout_share = 0.0
+
+    async def check(self, endpoint: str, identity: str, cost: float = 1):
+        """Raise 429 with Retry-After when `identity` is over its limit."""
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return
+        # A cost above the burst could never be paid; it empties the bucket instead
+        wait = await self.store.take(f"{endpoint}:{identity}", limit, min(cost, limit.burst))
+        if wait > 0:
+            ADMISSION_REJECTED.labels(endpoint, "rate_limited").inc()
+            logger.warning("Limite de requisições excedido", extra={"endpoint": endpoint, "identity": identity})
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded, try again later",
+                headers={"Retry-After": str(max(1, math.ceil(min(wait, 3600))))}
+            )
+
+    def limit(self, endpoint: str):
+        """FastAPI dependency applying the `endpoint` limit to the caller."""
+        async def dependency(request: Request):
+            await self.check(endpoint, await request_identity(request))
+        return dependency
+
+    def _record_wait(self, timed_out: bool):
+        self.timeout_share += 0.2 * (float(timed_out) - self.timeout_share)
+
+    async def acquire(self, endpoint: str) -> str:
+        """Take a global slot, or raise 503 (shed) past the latency target."""
+        started = time.monotonic()
+        token = await self.store.try_acquire(self.max_concurrency, self.slot_ttl)
+        if token is None and self.timeout_share > self.shed_threshold:
+            # Shed requests are not recorded: the share only falls again once
+            # a request finds a free slot, i.e. when capacity is back
+            self._shed(endpoint, "recent waits timed out")
+        while token is None:
+            if time.monotonic() - started >= self.queue_target:
+                self._record_wait(True)
+                self._shed(endpoint, "waited past latency target")
+            await asyncio.sleep(self.poll_interval)
+            token = await self.store.try_acquire(self.max_concurrency, self.slot_ttl)
+        self._record_wait(False)
+        return token
+
+    def _shed(self, endpoint: str, reason: str):
+        ADMISSION_REJECTED.labels(endpoint, "shed").inc()
+        logger.warning("Requisição descartada por sobrecarga", extra={
+            "endpoint": endpoint, "reason": reason, "timeout_share": round(self.timeout_share, 3)
+        })
+        raise Overloaded("Server overloaded, try again later", self.queue_target)
+
+    async def release(self, token: str):
+        await self.store.release(token)
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str):
+        """Hold a global slot for the duration of the block."""
+        with observe_phase("admission_wait"):
+            token = await self.acquire(endpoint)
+        try:
+            yield
+        finally:
+            await self.release(token)
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying the caller's `endpoint` rate limit to
+    `routes` before the app reads the request. Global slots are taken
+    around each upstream call instead (see llm.Provider.slot)."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        routes: Iterable[Tuple[str, str]] = (),
+        endpoint: str = "generate"
+    ):
+        self.app = app
+        self.controller = controller
+        self.routes = set(routes)
+        self.endpoint = endpoint
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        # The identity may come from the JSON body, which is then replayed to the app
+        request = Request(scope, receive)
+        try:
+            await self.controller.check(self.endpoint, await request_identity(request))
+        except HTTPException as e:
+            await self._reject(e, scope, receive, send)
+            return
+        await self.app(scope, self._replay(await request.body(), receive), send)
+
+    @staticmethod
+    async def _reject(error: HTTPException, scope: Scope, receive: Receive, send: Send):
+        response = JSONResponse({"detail": error.detail}, status_code=error.status_code, headers=error.headers)
+        await response(scope, receive, send)
+
+    @staticmethod
+    def _replay(body: bytes, receive: Receive) -> Receive:
+        replayed = False
+
+        async def replay():
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Later messages (http.disconnect) come from the client
+            return await receive()
+        return replay
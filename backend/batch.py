@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import math
+import random
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+import groq
+from fastapi import HTTPException
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+logger = logging.getLogger("briefing.batch")
+
+
+class Overloaded(HTTPException):
+    """503 raised by this server when it has no capacity left (a local queue
+    timeout or load shedding), as opposed to a 503 from the model provider.
+    Worth retrying, but it says nothing about the provider's rate limit."""
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(status_code=503, detail=detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether the model provider asked to slow down (429, or 503 from it)."""
+    return isinstance(error, groq.RateLimitError) or (
+        isinstance(error, HTTPException) and error.status_code in (429, 503) and not isinstance(error, Overloaded)
+    )
+
+
+def is_retryable(error: BaseException) -> bool:
+    if is_rate_limited(error) or isinstance(error, Overloaded):
+        return True
+    if isinstance(error, groq.APIConnectionError):
+        return True
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code >= 500
+    if isinstance(error, HTTPException):
+        return error.status_code == 504
+    return False
+
+
+def retry_delay(error: BaseException, attempt: int, base_delay: float) -> float:
+    """Seconds to wait before retry number `attempt`: the server's Retry-After
+    when it sent one, otherwise exponential backoff with jitter."""
+    retry_after = None
+    if isinstance(error, groq.APIStatusError):
+        retry_after = error.response.headers.get("retry-after")
+    elif isinstance(error, HTTPException) and error.headers:
+        retry_after = error.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return base_delay * 2 ** (attempt - 1) * (0.5 + random.random())
+
+
+class RateLimitGate:
+    """Shared pause: once any worker is rate limited, no worker sends new
+    requests until the advertised wait is over."""
+
+    def __init__(self):
+        self._resume_at = 0.0
+
+    def pause(self, seconds: float):
+        loop = asyncio.get_running_loop()
+        self._resume_at = max(self._resume_at, loop.time() + seconds)
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        while (delay := self._resume_at - loop.time()) > 0:
+            await asyncio.sleep(delay)
+
+
+async def run_batch(
+    items: List[T],
+    handler: Callable[[T], Awaitable[R]],
+    workers: int,
+    max_attempts: int = 4,
+    base_delay: float = 1.0
+) -> AsyncIterator[Tuple[int, Optional[R], Optional[BaseException]]]:
+    """Process `items` with a pool of `workers`, yielding (index, result, error)
+    in completion order. Rate-limit and transient upstream errors are retried
+    with backoff; other errors are reported for that item only."""
+    queue: "asyncio.Queue[Tuple[int, T]]" = asyncio.Queue()
+    for index, item in enumerate(items):
+        queue.put_nowait((index, item))
+    results: "asyncio.Queue[Tuple[int, Optional[R], Optional[BaseException]]]" = asyncio.Queue()
+    gate = RateLimitGate()
+
+    async def worker():
+        while not queue.empty():
+            index, item = queue.get_nowait()
+            attempt = 0
+            while True:
+                await gate.wait()
+                attempt += 1
+                try:
+                    result = await handler(item)
+                except Exception as e:
+                    if attempt >= max_attempts or not is_retryable(e):
+                        results.put_nowait((index, None, e))
+                        break
+                    delay = retry_delay(e, attempt, base_delay)
+                    logger.warning("Item falhou, nova tentativa agendada", extra={
+                        "index": index, "error": e.__class__.__name__, "attempt": attempt, "delay": round(delay, 2)
+                    })
+                    if is_rate_limited(e):
+                        gate.pause(delay)
+                    await asyncio.sleep(delay)
+                else:
+                    results.put_nowait((index, result, None))
+                    break
+
+    tasks = [asyncio.create_task(worker()) for _ in range(min(workers, len(items)))]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
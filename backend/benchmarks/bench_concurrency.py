@@ -0,0 +1,124 @@
+"""Load test for /generate-briefing against a local fake Groq server.
+
+Starts the fake Groq server and the backend as subprocesses, then fires
+requests at increasing concurrency and reports throughput and latency:
+
+    python benchmarks/bench_concurrency.py --levels 1 4 16 64 --requests 128
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONVERSATION = (
+    "Cliente: Oi, preciso de um site para minha padaria.\n"
+    "Designer: Claro! Qual o prazo e o orçamento?\n"
+    "Cliente: Queria entregar até o fim de abril, tenho uns 5 mil reais.\n"
+)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def backend_env(groq_url, **overrides):
+    """Settings for a backend under benchmark, calling the fake Groq server
+    at `groq_url`; `overrides` replace or add settings."""
+    return {
+        "GROQ_BASE_URL": groq_url,
+        "GROQ_API_KEY": "bench",
+        # Every request must reach the fake Groq server
+        "BRIEFING_CACHE_TTL": "0",
+        "LOG_LEVEL": "WARNING",
+        # One client sends everything; rate limits would only measure
+        # themselves, and the global cap would hide GROQ_MAX_CONCURRENCY
+        "ADMISSION_ENABLED": "0",
+        "ADMISSION_MAX_CONCURRENCY": "1000",
+        "SUPABASE_URL": os.getenv("SUPABASE_URL", "http://127.0.0.1:8101"),
+        "SUPABASE_KEY": os.getenv("SUPABASE_KEY", "bench.bench.bench"),
+        **overrides
+    }
+
+
+@contextmanager
+def serve(app, port, env=None):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.time() + 15
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+                break
+            except httpx.TransportError:
+                if time.time() > deadline or process.poll() is not None:
+                    raise RuntimeError(f"{app} did not start on port {port}")
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def run_level(url, concurrency, total):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post(
+                f"{url}/generate-briefing",
+                json={"conversation": CONVERSATION, "user_id": "bench"}
+            )
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return total / elapsed, percentile(latencies, 50), percentile(latencies, 95), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake Groq latency in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="fake Groq delay between tokens")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="GROQ_MAX_CONCURRENCY")
+    args = parser.parse_args()
+
+    fake_env = {"FAKE_GROQ_LATENCY": str(args.latency), "FAKE_GROQ_TOKEN_DELAY": str(args.token_delay)}
+    with serve("benchmarks.fake_groq:app", 8100, fake_env) as groq_url:
+        env = backend_env(groq_url, GROQ_MAX_CONCURRENCY=str(args.max_concurrency))
+        with serve("main:app", 8000, env) as url:
+            print(f"{'concurrency':>11} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8} {'errors':>6}")
+            for level in args.levels:
+                rps, p50, p95, errors = asyncio.run(run_level(url, level, args.requests))
+                print(f"{level:>11} {rps:>8.2f} {p50:>8.3f} {p95:>8.3f} {errors:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""End-to-end load test of the backend against local fake Groq and Supabase
+servers, with a stored baseline to catch regressions.
+
+Starts both fakes and the backend as subprocesses, then drives
+/generate-briefing (with and without injected upstream errors), POST
+/briefings and GET /briefings/{user_id} at increasing concurrency and data
+sizes. Each run reports throughput, p50/p95/p99 latency, errors, the
+backend's peak resident memory and its event-loop lag (mean and p99, from
+the event_loop_lag_seconds metric), as the median of --repeat runs:
+
+    python benchmarks/bench_e2e.py
+    python benchmarks/bench_e2e.py --save-baseline   # after an intended change
+    python benchmarks/bench_e2e.py --check           # exit 1 on regression
+
+Baselines are only comparable on the same machine and profile; record a
+new one before measuring a change elsewhere.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from bench_concurrency import backend_env, percentile, serve
+from conversations import synthetic_conversation
+from fake_groq import BRIEFING
+
+BASELINE = os.path.join(os.path.dirname(__file__), "data", "baseline_e2e.json")
+# Errors injected by the generate_errors scenario
+INJECTED_ERRORS = {"error_rate": 0.05, "rate_limit_rate": 0.02, "retry_after": 0.1}
+# Absolute slack on top of the relative tolerance, so that runs measured in
+# milliseconds do not fail on scheduler noise
+LATENCY_SLACK = 0.025
+LAG_SLACK = 0.005
+ERROR_RATE_SLACK = 0.02
+
+
+def scrape(url):
+    """Resident memory and event-loop lag histogram of the backend."""
+    families = {family.name: family for family in text_string_to_metric_families(httpx.get(f"{url}/metrics").text)}
+    rss = families["process_resident_memory_bytes"].samples[0].value if "process_resident_memory_bytes" in families else 0
+    lag = {}
+    for sample in families["event_loop_lag_seconds"].samples:
+        if sample.name.endswith("_bucket"):
+            lag[float(sample.labels["le"])] = sample.value
+        else:
+            lag[sample.name.rsplit("_", 1)[-1]] = sample.value
+    return rss, lag
+
+
+def lag_percentile(before, after, pct):
+    """Upper bound of the lag bucket holding the `pct` percentile of the
+    observations made between two scrapes."""
+    bounds = sorted(bound for bound in after if isinstance(bound, float))
+    counts = [after[bound] - before.get(bound, 0) for bound in bounds]
+    if not counts or counts[-1] == 0:
+        return 0.0
+    target = counts[-1] * pct / 100
+    for bound, count in zip(bounds, counts):
+        if count >= target:
+            # The +Inf bucket means more than the largest finite bound
+            return bound if bound != float("inf") else bounds[-2]
+    return bounds[-2]
+
+
+async def sample_memory(url, peak, stop):
+    async with httpx.AsyncClient() as client:
+        while not stop.is_set():
+            text = (await client.get(f"{url}/metrics")).text
+            for line in text.splitlines():
+                if line.startswith("process_resident_memory_bytes "):
+                    peak[0] = max(peak[0], float(line.split()[1]))
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run_scenario(url, make_request, concurrency, total):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker(client):
+        nonlocal errors
+        for index in remaining:
+            started = time.perf_counter()
+            response = await make_request(client, index)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    rss, lag_before = scrape(url)
+    peak = [rss]
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_memory(url, peak, stop))
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=None, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+    rss, lag_after = scrape(url)
+    return {
+        "rps": total / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "error_rate": errors / total,
+        "rss_mb": max(peak[0], rss) / 2 ** 20,
+        "lag_mean": (lag_after["sum"] - lag_before["sum"]) / max(1, lag_after["count"] - lag_before["count"]),
+        "lag_p99": lag_percentile(lag_before, lag_after, 99)
+    }
+
+
+def median_result(runs):
+    # Peak memory is the peak over every run; the rest is the median run
+    result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    result["rss_mb"] = max(run["rss_mb"] for run in runs)
+    return result
+
+
+def generate(conversation):
+    async def request(client, index):
+        # A distinct user per request: nothing is shared between requests
+        return await client.post("/generate-briefing", json={"conversation": conversation, "user_id": f"gen-{index}"})
+    return request
+
+
+async def save(client, index):
+    return await client.post("/briefings", json={"briefing": BRIEFING, "user_id": f"save-{index % 16}"})
+
+
+def list_page(user_id, limit):
+    async def request(client, index):
+        return await client.get(f"/briefings/{user_id}", params={"limit": limit})
+    return request
+
+
+def seed(supabase_url, user_id, rows):
+    """Insert `rows` briefings for `user_id` straight into the fake Supabase."""
+    row = {"titulo": f"Briefing - {BRIEFING['objetivo'][:30]}...", "conteudo": BRIEFING, "user_id": user_id}
+    for start in range(0, rows, 500):
+        count = min(500, rows - start)
+        httpx.post(f"{supabase_url}/rest/v1/briefings", json=[row] * count, timeout=None).raise_for_status()
+
+
+def scenarios(args, groq_url, supabase_url):
+    """(name, request factory, setup, teardown) of every run in the profile."""
+    clear = lambda: httpx.post(f"{groq_url}/config", json={"error_rate": 0, "rate_limit_rate": 0})  # noqa: E731
+    for size in args.sizes:
+        yield f"generate/{size}c", generate(synthetic_conversation(size)), None, None
+    inject = lambda: httpx.post(f"{groq_url}/config", json=INJECTED_ERRORS)  # noqa: E731
+    yield f"generate_errors/{args.sizes[0]}c", generate(synthetic_conversation(args.sizes[0])), inject, clear
+    yield "save", save, None, None
+    for rows in args.rows:
+        user_id = f"list-{rows}"
+        seed(supabase_url, user_id, rows)
+        yield f"list/{rows}rows", list_page(user_id, args.page_size), None, None
+
+
+def compare(baseline, results, tolerance, memory_tolerance):
+    """Regressions of `results` against `baseline`, as readable lines."""
+    regressions = []
+    for key, base in baseline.items():
+        current = results.get(key)
+        if current is None:
+            regressions.append(f"{key}: missing from this run")
+            continue
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {current['rps']:.1f} req/s < baseline {base['rps']:.1f}")
+        for name in ("p50", "p95", "p99"):
+            if current[name] > base[name] * (1 + tolerance) + LATENCY_SLACK:
+                regressions.append(f"{key}: {name} {current[name]:.3f}s > baseline {base[name]:.3f}s")
+        if current["error_rate"] > base["error_rate"] + ERROR_RATE_SLACK:
+            regressions.append(f"{key}: error rate {current['error_rate']:.1%} > baseline {base['error_rate']:.1%}")
+        if current["rss_mb"] > base["rss_mb"] * (1 + memory_tolerance):
+            regressions.append(f"{key}: peak memory {current['rss_mb']:.0f} MB > baseline {base['rss_mb']:.0f} MB")
+        # The p99 is only known to a histogram bucket, too coarse to compare
+        if current["lag_mean"] > base["lag_mean"] * (1 + tolerance) + LAG_SLACK:
+            regressions.append(
+                f"{key}: mean event-loop lag {current['lag_mean'] * 1000:.1f}ms"
+                f" > baseline {base['lag_mean'] * 1000:.1f}ms"
+            )
+    return regressions
+
+
+def profile(args):
+    return {
+        "levels": args.levels, "requests": args.requests, "sizes": args.sizes, "rows": args.rows,
+        "page_size": args.page_size, "latency": args.latency, "token_delay": args.token_delay,
+        "db_latency": args.db_latency, "repeat": args.repeat
+    }
+
+
+async def run(args, url, groq_url, supabase_url):
+    results = {}
+    print(f"{'scenario':<26} {'conc':>4} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8} {'p99 (s)':>8} "
+          f"{'errors':>6} {'rss MB':>6} {'lag avg':>7} {'lag p99':>7}")
+    for name, make_request, setup, teardown in scenarios(args, groq_url, supabase_url):
+        # Warm up (imports, connection pools) outside of the measured runs
+        async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+            await make_request(client, 0)
+        if setup:
+            setup()
+        try:
+            for level in args.levels:
+                runs = [
+                    await run_scenario(url, make_request, level, max(args.requests, level))
+                    for _ in range(args.repeat)
+                ]
+                result = median_result(runs)
+                results[f"{name}/c{level}"] = result
+                print(f"{name:<26} {level:>4} {result['rps']:>8.1f} {result['p50']:>8.3f} {result['p95']:>8.3f} "
+                      f"{result['p99']:>8.3f} {result['error_rate']:>6.1%} {result['rss_mb']:>6.0f} "
+                      f"{result['lag_mean'] * 1000:>5.1f}ms {result['lag_p99'] * 1000:>5.1f}ms")
+        finally:
+            if teardown:
+                teardown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32], help="concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="requests per scenario and level")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2_000, 20_000], help="conversation sizes in chars")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 5_000], help="stored briefings per listed user")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario and level; the median is kept")
+    parser.add_argument("--page-size", type=int, default=50, help="limit of each listed page")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Groq latency in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="fake Groq delay between tokens")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="fake Supabase latency in seconds")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--check", action="store_true", help="compare with the baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative slowdown")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="allowed relative memory growth")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.check:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["profile"] != profile(args):
+            sys.exit(f"Baseline profile {baseline['profile']} does not match this run {profile(args)}")
+
+    groq_env = {"FAKE_GROQ_LATENCY": str(args.latency), "FAKE_GROQ_TOKEN_DELAY": str(args.token_delay)}
+    supabase_env = {"FAKE_SUPABASE_LATENCY": str(args.db_latency)}
+    with serve("benchmarks.fake_groq:app", 8100, groq_env) as groq_url, \
+            serve("benchmarks.fake_supabase:app", 8101, supabase_env) as supabase_url:
+        env = backend_env(
+            groq_url, GROQ_MAX_CONCURRENCY="64", BRIEFING_STORE="supabase", SUPABASE_URL=supabase_url
+        )
+        with serve("main:app", 8000, env) as url:
+            results = asyncio.run(run(args, url, groq_url, supabase_url))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"profile": profile(args), "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nbaseline saved to {args.baseline}")
+    if baseline is not None:
+        regressions = compare(baseline["results"], results, args.tolerance, args.memory_tolerance)
+        if regressions:
+            print("\nREGRESSIONS against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nno regression against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark map-reduce extraction of long conversations against a fake Groq
+server, comparing it with sending the whole conversation in one prompt.
+
+Reports latency, prompt tokens sent upstream, upstream calls and peak Python
+memory of the backend for synthetic conversations of increasing size:
+
+    python benchmarks/bench_long_conversations.py --sizes 10000 100000 500000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+import httpx
+
+from bench_concurrency import BACKEND_DIR, backend_env, serve
+from conversations import synthetic_conversation
+
+
+async def measure(client, groq, conversation):
+    await groq.delete("/stats")
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = await client.post("/generate-briefing", json={"conversation": conversation, "user_id": "bench"})
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    response.raise_for_status()
+    stats = (await groq.get("/stats")).json()
+    return elapsed, stats["prompt_tokens"], stats["requests"], peak
+
+
+async def run(args, groq_url):
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=None) as client, \
+            httpx.AsyncClient(base_url=groq_url) as groq:
+        print(f"{'chars':>8} {'mode':>10} {'latency (s)':>11} {'prompt tok':>10} {'calls':>5} {'peak MiB':>8}")
+        for size in args.sizes:
+            conversation = synthetic_conversation(size)
+            for mode, threshold in (("single", sys.maxsize), ("map-reduce", args.threshold)):
+                main.LONG_CONVERSATION_CHARS = threshold
+                elapsed, tokens, calls, peak = await measure(client, groq, conversation)
+                print(f"{size:>8} {mode:>10} {elapsed:>11.3f} {tokens:>10} {calls:>5} {peak / 2**20:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000, 250_000, 500_000])
+    parser.add_argument("--threshold", type=int, default=16_000, help="LONG_CONVERSATION_CHARS")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq base latency")
+    parser.add_argument("--latency-per-1k", type=float, default=0.02, help="fake Groq latency per 1k prompt tokens")
+    args = parser.parse_args()
+
+    fake_env = {
+        "FAKE_GROQ_LATENCY": str(args.latency),
+        "FAKE_GROQ_LATENCY_PER_1K_PROMPT_TOKENS": str(args.latency_per_1k),
+        "FAKE_GROQ_TOKEN_DELAY": "0"
+    }
+    with serve("benchmarks.fake_groq:app", 8100, fake_env) as groq_url:
+        os.environ.update(backend_env(groq_url, GROQ_MAX_CONCURRENCY="32"))
+        asyncio.run(run(args, groq_url))
+
+
+if __name__ == "__main__":
+    main()
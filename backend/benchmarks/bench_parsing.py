@@ -0,0 +1,97 @@
+"""Benchmark structured-output parsing on recorded bad model answers.
+
+Replays benchmarks/data/bad_responses.jsonl (fences, prose, truncation,
+currency strings, missing fields...) through the briefing parser and compares
+upstream calls per successful briefing with the previous strict parser, where
+any failure meant resubmitting the whole prompt:
+
+    python benchmarks/bench_parsing.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from bench_concurrency import BACKEND_DIR
+from conversations import synthetic_conversation
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "bad_responses.jsonl")
+
+
+def strict_parse(text, model):
+    """The parser used before: first "{" to last "}", json.loads, validation."""
+    start, end = text.find("{"), text.rfind("}") + 1
+    if start == -1 or end == 0:
+        raise ValueError("JSON não encontrado na resposta")
+    return model(**json.loads(text[start:end]))
+
+
+async def run(args):
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    conversation = synthetic_conversation(args.conversation_chars)
+    prompt_chars = len(main.build_briefing_prompt(conversation))
+
+    print(f"{'case':<22} {'strict':>6} {'new':>4} {'outcome':>9} {'prompt chars':>12} {'parse (µs)':>10}")
+    totals = {"strict": 0, "new": 0, "strict_chars": 0, "new_chars": 0}
+    for case in corpus:
+        # Strict parser: a failed parse resubmits the full prompt
+        try:
+            strict_parse(case["response"], main.BriefingResponse)
+            strict_calls = 1
+        except ValueError:
+            strict_calls = 2
+
+        sent = [prompt_chars]
+
+        async def create_completion(prompt):
+            sent.append(len(prompt))
+            return main.Completion(case.get("repair_response", ""), "replay", "replay")
+
+        main.create_completion = create_completion
+        outcome = "ok"
+        try:
+            data = await main.complete_briefing(conversation, case["response"])
+            main.BriefingResponse(**data)
+            if len(sent) > 1:
+                outcome = "reasked"
+        except ValueError:
+            # No JSON at all: the caller gets a 500 and resubmits
+            outcome = "resubmit"
+            sent.append(prompt_chars)
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            main.coerce_briefing(main.parse_json_object(case["response"])[0] or {})
+        parse_us = (time.perf_counter() - started) / args.repeat * 1e6
+
+        totals["strict"] += strict_calls
+        totals["new"] += len(sent)
+        totals["strict_chars"] += strict_calls * prompt_chars
+        totals["new_chars"] += sum(sent)
+        print(f"{case['name']:<22} {strict_calls:>6} {len(sent):>4} {outcome:>9} {sum(sent):>12} {parse_us:>10.1f}")
+
+    count = len(corpus)
+    print(f"\ncalls per briefing: strict {totals['strict'] / count:.2f}, new {totals['new'] / count:.2f}")
+    print(f"prompt chars per briefing: strict {totals['strict_chars'] / count:.0f}, new {totals['new_chars'] / count:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversation-chars", type=int, default=4000, help="size of the replayed conversation")
+    parser.add_argument("--repeat", type=int, default=2000, help="parse iterations per case for timing")
+    args = parser.parse_args()
+    # The backend is imported in-process; no upstream or database is contacted
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ.setdefault("BRIEFING_STORE", "sqlite")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark conversation preprocessing on sample WhatsApp, Telegram and
+email-thread exports against a fake Groq server.
+
+For each export, reports estimated tokens before and after compaction,
+preprocessing time, end-to-end latency and prompt tokens sent upstream with
+preprocessing off and on, and how many of the briefing facts in the raw
+export survive compaction, as well as how many designer questions still
+have their yes/no answer ("Cliente: Não") next to them:
+
+    python benchmarks/bench_preprocess.py --sizes 4000 16000 64000
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+import httpx
+
+from bench_concurrency import BACKEND_DIR, backend_env, serve
+from conversations import DECISIONS, email_thread, telegram_export, whatsapp_export
+
+EXPORTS = {"whatsapp": whatsapp_export, "telegram": telegram_export, "email": email_thread}
+# Facts the briefing is built from; each must survive preprocessing
+FACTS = ["pães artesanais", "famílias do bairro", "Padaria Real", "01/03", "30/04", "5000 reais",
+         "fundo claro", "20/03", "encomendas para festas"]
+
+
+def decisions_kept(conversation, compacted, newest_first=False):
+    """(questions answered in `compacted`, questions in `conversation`).
+    Speaker merging may join the question or the answer to neighbouring
+    messages of the same speaker, but nothing may come between them."""
+    asked = kept = 0
+    for question, answer in DECISIONS:
+        question = re.escape(question.split(": ", 1)[1]) + r" \(item \d+\)"
+        answer = re.escape(answer.split(": ", 1)[1])
+        # Quoted email history ("> ...") repeats questions already counted
+        asked += len(re.findall(rf"(?<!> ){question}", conversation))
+        if newest_first:
+            # Email threads are pasted newest first: the answer comes before
+            pattern = rf"(?:^|\n)Cliente: (?:[^\n]* / )?{answer}\nDesigner: {question}"
+        else:
+            pattern = rf"{question}(?: / [^\n]*)?\nCliente: {answer}(?= / |\n|$)"
+        kept += len(re.findall(pattern, compacted))
+    return kept, asked
+
+
+async def measure(client, groq, conversation):
+    await groq.delete("/stats")
+    started = time.perf_counter()
+    response = await client.post("/generate-briefing", json={"conversation": conversation, "user_id": "bench"})
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    stats = (await groq.get("/stats")).json()
+    return elapsed, stats["prompt_tokens"]
+
+
+async def run(args, groq_url):
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    from preprocess import preprocess_conversation
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=None) as client, \
+            httpx.AsyncClient(base_url=groq_url) as groq:
+        print(f"{'export':>8} {'chars':>7} {'tok raw':>7} {'tok out':>7} {'prep ms':>7} "
+              f"{'off (s)':>7} {'on (s)':>7} {'up tok off':>10} {'up tok on':>9} {'facts':>5} {'answers':>7}")
+        for name, export in EXPORTS.items():
+            for size in args.sizes:
+                conversation = export(size)
+                started = time.perf_counter()
+                result = preprocess_conversation(conversation, main.PROMPT_TOKEN_BUDGET)
+                prep_ms = (time.perf_counter() - started) * 1000
+
+                raw_facts = [fact for fact in FACTS if fact in conversation]
+                kept = sum(fact in result.text for fact in raw_facts)
+                answered, asked = decisions_kept(conversation, result.text, newest_first=name == "email")
+
+                main.PREPROCESS_CONVERSATIONS = False
+                off_latency, off_tokens = await measure(client, groq, conversation)
+                main.PREPROCESS_CONVERSATIONS = True
+                on_latency, on_tokens = await measure(client, groq, conversation)
+                print(f"{name:>8} {len(conversation):>7} {result.tokens_before:>7} {result.tokens_after:>7} "
+                      f"{prep_ms:>7.1f} {off_latency:>7.3f} {on_latency:>7.3f} {off_tokens:>10} {on_tokens:>9} "
+                      f"{kept:>2}/{len(raw_facts):<2} {answered:>3}/{asked:<3}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4_000, 16_000, 64_000])
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq base latency")
+    parser.add_argument("--latency-per-1k", type=float, default=0.05, help="fake Groq latency per 1k prompt tokens")
+    args = parser.parse_args()
+
+    fake_env = {
+        "FAKE_GROQ_LATENCY": str(args.latency),
+        "FAKE_GROQ_LATENCY_PER_1K_PROMPT_TOKENS": str(args.latency_per_1k),
+        "FAKE_GROQ_TOKEN_DELAY": "0"
+    }
+    with serve("benchmarks.fake_groq:app", 8100, fake_env) as groq_url:
+        os.environ.update(backend_env(groq_url, GROQ_MAX_CONCURRENCY="32", BRIEFING_STORE="sqlite"))
+        asyncio.run(run(args, groq_url))
+
+
+if __name__ == "__main__":
+    main()
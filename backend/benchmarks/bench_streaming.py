@@ -0,0 +1,59 @@
+"""Compare time-to-first-field of /generate-briefing/stream with the time
+the blocking /generate-briefing endpoint takes to answer.
+
+    python benchmarks/bench_streaming.py --requests 10 --token-delay 0.02
+"""
+import argparse
+import json
+import statistics
+import time
+
+import httpx
+
+from bench_concurrency import CONVERSATION, backend_env, serve
+
+
+def measure_blocking(client, url):
+    started = time.perf_counter()
+    response = client.post(f"{url}/generate-briefing", json={"conversation": CONVERSATION, "user_id": "bench"})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def measure_streaming(client, url):
+    started = time.perf_counter()
+    first_token = first_field = None
+    with client.stream("POST", f"{url}/generate-briefing/stream", json={"conversation": CONVERSATION, "user_id": "bench"}) as response:
+        for line in response.iter_lines():
+            event = json.loads(line)
+            elapsed = time.perf_counter() - started
+            if event["type"] == "token" and first_token is None:
+                first_token = elapsed
+            elif event["type"] == "field" and first_field is None:
+                first_field = elapsed
+            elif event["type"] == "error":
+                raise RuntimeError(event["detail"])
+    return first_token, first_field, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake Groq time to first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="fake Groq delay between tokens")
+    args = parser.parse_args()
+
+    fake_env = {"FAKE_GROQ_LATENCY": str(args.latency), "FAKE_GROQ_TOKEN_DELAY": str(args.token_delay)}
+    with serve("benchmarks.fake_groq:app", 8100, fake_env) as groq_url:
+        with serve("main:app", 8000, backend_env(groq_url)) as url, httpx.Client(timeout=None) as client:
+            blocking = [measure_blocking(client, url) for _ in range(args.requests)]
+            streaming = [measure_streaming(client, url) for _ in range(args.requests)]
+
+    print(f"blocking  full response     median {statistics.median(blocking):.3f}s")
+    print(f"streaming first token       median {statistics.median(s[0] for s in streaming):.3f}s")
+    print(f"streaming first field       median {statistics.median(s[1] for s in streaming):.3f}s")
+    print(f"streaming full briefing     median {statistics.median(s[2] for s in streaming):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Synthetic WhatsApp-style conversations for the benchmarks."""
+import random
+from datetime import datetime, timedelta
+
+RELEVANT = [
+    "Cliente: O objetivo é lançar a nova linha de pães artesanais no site.",
+    "Cliente: Nosso público são famílias do bairro, principalmente entre 30 e 50 anos.",
+    "Cliente: Gosto muito do site da Padaria Real como referência.",
+    "Designer: Podemos começar dia 01/03 e entregar até 30/04?",
+    "Cliente: O orçamento total é de 5000 reais, pago em duas etapas.",
+    "Cliente: Quero que as fotos dos produtos tenham fundo claro.",
+    "Designer: Vou preparar o layout da home e te mando até o dia 20/03.",
+    "Cliente: Precisamos de uma página de encomendas para festas.",
+]
+NOISE = [
+    "Cliente: Oi", "Designer: Bom dia!", "Cliente: ok", "Designer: <Mídia oculta>",
+    "Cliente: kkkk", "Designer: Obrigado!", "Cliente: 👍", "Cliente: blz",
+]
+
+
+def synthetic_conversation(size: int, seed: int = 0, noise_ratio: float = 0.4) -> str:
+    """Build a conversation of roughly `size` characters."""
+    rng = random.Random(seed)
+    moment = datetime(2025, 2, 1, 9, 0)
+    lines = []
+    length = 0
+    while length < size:
+        moment += timedelta(minutes=rng.randint(1, 90))
+        pool = NOISE if rng.random() < noise_ratio else RELEVANT
+        line = f"{moment:%d/%m/%Y %H:%M} - {rng.choice(pool)}"
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+
+# Exports as the apps write them, with the metadata and noise preprocessing removes
+SYSTEM_LINES = [
+    "As mensagens e as chamadas são protegidas com a criptografia de ponta a ponta.",
+    "Designer adicionou Cliente",
+]
+# A designer question answered with a bare yes/no; the answer is the decision
+DECISIONS = [
+    ("Designer: Posso usar a logo antiga?", "Cliente: Não"),
+    ("Designer: O valor inclui hospedagem?", "Cliente: Sim"),
+    ("Designer: Fechamos a entrega para o dia 30/04?", "Cliente: Ok"),
+    ("Designer: Mantemos as fotos atuais do cardápio?", "Cliente: Não"),
+]
+SIGNATURE = "\n--\nAna Souza\nPadaria Real | (11) 91234-5678\nEnviado do meu iPhone"
+
+
+def _messages(size: int, seed: int, noise_ratio: float):
+    rng = random.Random(seed)
+    moment = datetime(2025, 2, 1, 9, 0)
+    length = 0
+    previous = None
+    while length < size:
+        moment += timedelta(minutes=rng.randint(1, 90))
+        if rng.random() < 0.08:
+            question, answer = rng.choice(DECISIONS)
+            # Numbered like the relevant messages; the answers repeat verbatim
+            yield moment, "Designer", f"{question.split(': ', 1)[1]} (item {length})"
+            moment += timedelta(minutes=rng.randint(1, 10))
+            yield moment, "Cliente", answer.split(": ", 1)[1]
+            previous = None
+            length += len(question) + len(answer) + 40
+            continue
+        if previous and rng.random() < 0.1:
+            # Forwarded or re-sent message
+            line = previous
+        elif rng.random() < noise_ratio:
+            line = rng.choice(NOISE)
+        else:
+            # Numbered so that only real repeats are duplicates
+            line = f"{rng.choice(RELEVANT)} (item {length})"
+        speaker, text = line.split(": ", 1)
+        if text.startswith("<"):
+            text = "<Mídia oculta>"
+        elif rng.random() < 0.05:
+            text += " <Mensagem editada>"
+        previous = line
+        length += len(line) + 20
+        yield moment, speaker, text
+
+
+def whatsapp_export(size: int, seed: int = 0, noise_ratio: float = 0.4) -> str:
+    lines = [f"01/02/2025 09:00 - {line}" for line in SYSTEM_LINES]
+    for moment, speaker, text in _messages(size, seed, noise_ratio):
+        lines.append(f"{moment:%d/%m/%Y %H:%M} - {speaker}: {text}")
+    return "\n".join(lines)
+
+
+def telegram_export(size: int, seed: int = 0, noise_ratio: float = 0.4) -> str:
+    lines = []
+    for moment, speaker, text in _messages(size, seed, noise_ratio):
+        lines += [f"{speaker}, [{moment:%d.%m.%y %H:%M}]", text, ""]
+    return "\n".join(lines)
+
+
+def email_thread(size: int, seed: int = 0, noise_ratio: float = 0.4) -> str:
+    """Thread pasted newest first; each email quotes the one before it."""
+    emails = []
+    quoted = ""
+    for moment, speaker, text in _messages(size // 3, seed, noise_ratio):
+        header = f"{speaker} <{speaker.lower()}@example.com>"
+        body = f"{text}{SIGNATURE if speaker == 'Cliente' else ''}"
+        email = f"De: {header}\nEnviado em: {moment:%d/%m/%Y %H:%M}\nAssunto: RE: Site da padaria\n\n{body}"
+        if quoted:
+            email += f"\n\nEm {moment:%d/%m/%Y}, {speaker} escreveu:\n" + "\n".join(f"> {line}" for line in quoted.splitlines())
+        quoted = body
+        emails.append(email)
+    return "\n\n".join(reversed(emails))
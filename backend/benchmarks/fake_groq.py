@@ -0,0 +1,159 @@
+"""Minimal stand-in for the Groq chat completions API, used by the benchmarks.
+
+Run it with uvicorn and point the backend at it through GROQ_BASE_URL:
+
+    FAKE_GROQ_LATENCY=0.5 FAKE_GROQ_TOKEN_DELAY=0.01 uvicorn benchmarks.fake_groq:app --port 8100
+    GROQ_BASE_URL=http://127.0.0.1:8100 uvicorn main:app
+
+Settings can also be changed while it runs, e.g. to inject errors for one
+scenario: POST /config {"error_rate": 0.05, "rate_limit_rate": 0.02}.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+config = {
+    # Seconds each completion takes to "generate"
+    "latency": float(os.getenv("FAKE_GROQ_LATENCY", "0.5")),
+    # Seconds between streamed tokens; latency is then the time to first token
+    "token_delay": float(os.getenv("FAKE_GROQ_TOKEN_DELAY", "0.01")),
+    # Extra seconds per 1000 prompt tokens, to model slower prefill on long prompts
+    "latency_per_1k_prompt_tokens": float(os.getenv("FAKE_GROQ_LATENCY_PER_1K_PROMPT_TOKENS", "0")),
+    # Share of requests answered with 503, and with 429 plus Retry-After
+    "error_rate": float(os.getenv("FAKE_GROQ_ERROR_RATE", "0")),
+    "rate_limit_rate": float(os.getenv("FAKE_GROQ_RATE_LIMIT_RATE", "0")),
+    "retry_after": float(os.getenv("FAKE_GROQ_RETRY_AFTER", "1"))
+}
+# Seeded so that a scenario injects the same errors on every run
+rng = random.Random(int(os.getenv("FAKE_GROQ_SEED", "0")))
+# Characters per streamed token
+TOKEN_SIZE = 4
+
+BRIEFING = {
+    "objetivo": "Criar o site institucional da padaria com cardápio online",
+    "publico_alvo": "Moradores do bairro entre 25 e 55 anos",
+    "referencias": ["site da Padaria Real", "paleta em tons terrosos"],
+    "prazos": {
+        "inicio": "01/03/2025",
+        "entrega": "30/04/2025",
+        "etapas_intermediarias": "layout aprovado até 20/03/2025"
+    },
+    "orcamento": {"total": 5000.0, "por_etapa": 2500.0},
+    "observacoes": ["cliente prefere contato por WhatsApp"]
+}
+
+app = FastAPI()
+
+stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "errors": 0, "rate_limited": 0}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.delete("/stats")
+async def reset_stats():
+    for key in stats:
+        stats[key] = 0
+    return stats
+
+
+@app.get("/config")
+async def get_config():
+    return config
+
+
+@app.post("/config")
+async def set_config(request: Request):
+    updates = await request.json()
+    unknown = set(updates) - set(config)
+    if unknown:
+        return JSONResponse({"error": f"unknown settings: {sorted(unknown)}"}, status_code=400)
+    config.update({key: float(value) for key, value in updates.items()})
+    return config
+
+
+def injected_error():
+    draw = rng.random()
+    if draw < config["rate_limit_rate"]:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": str(config["retry_after"])}
+        )
+    if draw < config["rate_limit_rate"] + config["error_rate"]:
+        stats["errors"] += 1
+        return JSONResponse(
+            {"error": {"message": "Service unavailable", "type": "internal_server_error"}}, status_code=503
+        )
+    return None
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    content = json.dumps(BRIEFING, ensure_ascii=False)
+    prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+    stats["requests"] += 1
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += len(content) // 4
+    await asyncio.sleep(config["latency"] + config["latency_per_1k_prompt_tokens"] * prompt_tokens / 1000)
+    error = injected_error()
+    if error is not None:
+        return error
+    if body.get("stream"):
+        return StreamingResponse(stream_tokens(body["model"], content), media_type="text/event-stream")
+    # A blocking completion only returns once every token was generated
+    await asyncio.sleep(config["token_delay"] * len(content) / TOKEN_SIZE)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": prompt_tokens + len(content) // 4
+        }
+    }
+
+
+async def stream_tokens(model, content):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    for start in range(0, len(content), TOKEN_SIZE):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "delta": {"content": content[start:start + TOKEN_SIZE]},
+                "finish_reason": None
+            }]
+        }
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        await asyncio.sleep(config["token_delay"])
+    done = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+    }
+    yield f"data: {json.dumps(done)}\n\n"
+    yield "data: [DONE]\n\n"
@@ -0,0 +1,154 @@
+"""Minimal stand-in for the Supabase (PostgREST) API of the briefings table,
+used by the benchmarks.
+
+It answers the requests SupabaseBriefingRepository makes: bulk inserts,
+keyset-paginated listing with column selection, and the search_briefings
+RPC. Rows are kept in an in-memory SQLiteBriefingRepository, so paging and
+search behave like the local store. Point the backend at it with:
+
+    FAKE_SUPABASE_LATENCY=0.005 uvicorn benchmarks.fake_supabase:app --port 8101
+    SUPABASE_URL=http://127.0.0.1:8101 SUPABASE_KEY=bench uvicorn main:app
+
+Settings can be changed while it runs: POST /config {"latency": 0.02}.
+"""
+import asyncio
+import os
+import random
+import re
+import sys
+from datetime import date
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from repository import FULL_COLUMNS, SQLiteBriefingRepository  # noqa: E402
+from search import SearchQuery  # noqa: E402
+
+config = {
+    # Seconds added to every query, as the network round trip to Supabase
+    "latency": float(os.getenv("FAKE_SUPABASE_LATENCY", "0.005")),
+    # Extra seconds per row returned or inserted
+    "latency_per_row": float(os.getenv("FAKE_SUPABASE_LATENCY_PER_ROW", "0")),
+    # Share of requests answered with 503
+    "error_rate": float(os.getenv("FAKE_SUPABASE_ERROR_RATE", "0"))
+}
+rng = random.Random(int(os.getenv("FAKE_SUPABASE_SEED", "0")))
+# "objetivo:conteudo->objetivo" selects a conteudo field as a top-level key
+SELECTED_FIELD = re.compile(r"^(\w+):conteudo->(\w+)$")
+# The keyset filter built by SupabaseBriefingRepository.list_page
+KEYSET = re.compile(r'^\(created_at\.lt\."([^"]+)",and\(created_at\.eq\."[^"]+",id\.lt\.([^)]+)\)\)$')
+
+app = FastAPI()
+repository = SQLiteBriefingRepository()
+
+stats = {"requests": 0, "inserted": 0, "listed": 0, "searched": 0, "errors": 0}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.delete("/stats")
+async def reset_stats():
+    for key in stats:
+        stats[key] = 0
+    return stats
+
+
+@app.get("/config")
+async def get_config():
+    return config
+
+
+@app.post("/config")
+async def set_config(request: Request):
+    updates = await request.json()
+    unknown = set(updates) - set(config)
+    if unknown:
+        return JSONResponse({"error": f"unknown settings: {sorted(unknown)}"}, status_code=400)
+    config.update({key: float(value) for key, value in updates.items()})
+    return config
+
+
+async def simulate(rows: int = 0):
+    """Wait like a remote query would; returns an error response to send
+    instead of the result when one is injected."""
+    stats["requests"] += 1
+    await asyncio.sleep(config["latency"] + config["latency_per_row"] * rows)
+    if rng.random() < config["error_rate"]:
+        stats["errors"] += 1
+        return JSONResponse({"message": "Service unavailable"}, status_code=503)
+    return None
+
+
+def project(row: dict, columns: str) -> dict:
+    if columns in ("*", FULL_COLUMNS):
+        return row
+    result = {}
+    for column in columns.split(","):
+        match = SELECTED_FIELD.match(column)
+        if match:
+            result[match.group(1)] = row["conteudo"].get(match.group(2))
+        else:
+            result[column] = row[column]
+    return result
+
+
+@app.post("/rest/v1/briefings")
+async def insert_briefings(request: Request):
+    rows = await request.json()
+    if isinstance(rows, dict):
+        rows = [rows]
+    error = await simulate(len(rows))
+    if error is not None:
+        return error
+    saved = await repository.insert_many(rows)
+    stats["inserted"] += len(saved)
+    columns = request.query_params.get("select", "*")
+    if "return=representation" not in request.headers.get("prefer", ""):
+        return JSONResponse(None, status_code=201)
+    return JSONResponse([project(row, columns) for row in saved], status_code=201)
+
+
+@app.get("/rest/v1/briefings")
+async def list_briefings(request: Request):
+    params = request.query_params
+    user_id = params.get("user_id", "")
+    if not user_id.startswith("eq."):
+        return JSONResponse({"message": "only user_id=eq.<id> filters are supported"}, status_code=400)
+    after = None
+    if "or" in params:
+        match = KEYSET.match(params["or"])
+        if not match:
+            return JSONResponse({"message": "unsupported or filter"}, status_code=400)
+        after = (match.group(1), match.group(2))
+    columns = params.get("select", "*")
+
+    rows = await repository.list_page(user_id[3:], int(params.get("limit", "1000")), after)
+    error = await simulate(len(rows))
+    if error is not None:
+        return error
+    stats["listed"] += len(rows)
+    # JSONResponse directly: FastAPI's encoder would make the fake the bottleneck
+    return JSONResponse([project(row, columns) for row in rows])
+
+
+@app.post("/rest/v1/rpc/search_briefings")
+async def search_briefings(request: Request):
+    body = await request.json()
+    rows = await repository.search(SearchQuery(
+        user_id=body["p_user_id"],
+        text=body.get("p_query"),
+        orcamento_min=body.get("p_orcamento_min"),
+        orcamento_max=body.get("p_orcamento_max"),
+        entrega_from=date.fromisoformat(body["p_entrega_from"]) if body.get("p_entrega_from") else None,
+        entrega_to=date.fromisoformat(body["p_entrega_to"]) if body.get("p_entrega_to") else None,
+        limit=body.get("p_limit") or 20
+    ))
+    error = await simulate(len(rows))
+    if error is not None:
+        return error
+    stats["searched"] += len(rows)
+    return JSONResponse(rows)
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+
+def normalize_conversation(conversation: str) -> str:
+    """Canonical form used for cache keys, so that resubmissions differing only
+    in whitespace, line endings or letter case hit the same entry."""
+    text = unicodedata.normalize("NFKC", conversation).lower()
+    lines = (re.sub(r"\s+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(conversation: str, model: str, temperature: float, prompt_version: str) -> str:
+    payload = json.dumps(
+        [normalize_conversation(conversation), model, temperature, prompt_version],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCacheStore:
+    """Persistent cache tier, shared by every worker pointing at the same file."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute(
+            "create table if not exists briefing_cache ("
+            " key text primary key, value text not null, expires_at real not null)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "select value, expires_at from briefing_cache where key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict, expires_at: float, max_entries: int):
+        with self._lock:
+            self._conn.execute(
+                "insert or replace into briefing_cache (key, value, expires_at) values (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+            self._conn.execute("delete from briefing_cache where expires_at < ?", (time.time(),))
+            # Trim to size, dropping the entries closest to expiry first
+            self._conn.execute(
+                "delete from briefing_cache where key in ("
+                " select key from briefing_cache order by expires_at desc limit -1 offset ?)",
+                (max_entries,)
+            )
+            self._conn.commit()
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class BriefingCache:
+    """Two-tier (in-process LRU + optional SQLite) cache of generated briefings
+    with single-flight coalescing of concurrent identical requests."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, store: Optional[SQLiteCacheStore] = None,
+                 store_max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+        self.store_max_entries = store_max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and (self.max_entries > 0 or self.store is not None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "in_flight": len(self._inflight)
+        }
+
+    async def lookup(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at >= time.time():
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+        if self.store is not None:
+            value = await asyncio.to_thread(self.store.get, key)
+            if value is not None:
+                self._remember(key, value, time.time() + self.ttl)
+                return value
+        return None
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Like lookup, but counted in the hit/miss statistics."""
+        value = await self.lookup(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def store_value(self, key: str, value: dict):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.set, key, value, expires_at, self.store_max_entries)
+
+    def _remember(self, key: str, value: dict, expires_at: float):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        """Return the cached value for `key`, or run `compute` once for all
+        concurrent callers asking for the same key.
+
+        The upstream computation is cancelled only when every caller waiting
+        on it has been cancelled (e.g. all their clients disconnected).
+        """
+        cached = await self.lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.misses += 1
+            flight = _Flight(asyncio.ensure_future(self._compute_and_store(key, compute)))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget_flight(key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[dict]]) -> dict:
+        value = await compute()
+        await self.store_value(key, value)
+        return value
+
+    def _forget_flight(self, key: str, flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        # Nobody may be left to retrieve the exception of a cancelled flight
+        if not flight.task.cancelled():
+            flight.task.exception()
@@ -0,0 +1,155 @@
+import re
+import unicodedata
+from typing import Dict, Iterable, List
+
+# A line opens a new message when it starts with a timestamp ("12/03/2024 10:15 -",
+# "[12/03/24, 10:15:00]") or a short speaker prefix ("Cliente:", "Ana Souza:")
+MESSAGE_START = re.compile(
+    r"^\s*(\[?\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4},?\s+\d{1,2}:\d{2}|[^\s:][^:\n]{0,40}:\s)"
+)
+
+# Messages that never carry briefing information: media and deleted-message
+# placeholders, greetings, thanks and laughter. Short replies such as "sim",
+# "não", "ok" or "beleza" are kept, since they answer (approve or reject) the
+# message before them.
+NOISE = re.compile(
+    r"^(<?(m[íi]dia|media|imagem|image|v[íi]deo|video|[áa]udio|audio|figurinha|sticker)"
+    r"[^>]*(omitid[oa]|omitted|ocult[oa])>?|essa mensagem foi apagada|this message was deleted"
+    r"|mensagem apagada|valeu|obrigad[oa]|brigad[oa]"
+    r"|oi+|ol[áa]|bom dia|boa tarde|boa noite|tchau|at[ée] mais|kk+|haha+|rs+)[\s!.?]*$",
+    re.IGNORECASE
+)
+MESSAGE_PREFIX = re.compile(
+    r"^\s*\[?\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4},?\s+\d{1,2}:\d{2}(:\d{2})?\]?\s*-?\s*([^:\n]{1,40}:\s*)?"
+    r"|^\s*[^\s:][^:\n]{0,40}:\s*"
+)
+
+# Placeholder values the model uses when a chunk says nothing about a field
+EMPTY_VALUES = {"", "-", "n/a", "na", "none", "null", "nenhum", "nenhuma", "não informado",
+                "não informada", "não especificado", "não especificada", "não mencionado",
+                "não mencionada", "indefinido", "a definir"}
+
+
+def split_messages(conversation: str) -> List[str]:
+    """Split a chat export into messages, keeping multi-line messages together.
+
+    Text without recognizable message prefixes (e.g. pasted emails) is split
+    on blank lines instead.
+    """
+    lines = conversation.splitlines()
+    if not any(MESSAGE_START.match(line) for line in lines):
+        return [block.strip() for block in re.split(r"\n\s*\n", conversation) if block.strip()]
+
+    messages: List[str] = []
+    for line in lines:
+        if MESSAGE_START.match(line) or not messages:
+            messages.append(line)
+        else:
+            messages[-1] += "\n" + line
+    return [message for message in (m.strip() for m in messages) if message]
+
+
+def has_content(text: str) -> bool:
+    """False for punctuation-only text. Emoji count as content: a 👍 after a
+    question is an answer."""
+    return any(char.isalnum() or unicodedata.category(char) == "So" for char in text)
+
+
+def is_irrelevant(message: str) -> bool:
+    """Cheap check for messages with no briefing content (greetings, media, thanks)."""
+    body = MESSAGE_PREFIX.sub("", message, count=1).strip()
+    if not body:
+        return True
+    if NOISE.match(body):
+        return True
+    return not has_content(body)
+
+
+def chunk_conversation(conversation: str, max_chars: int) -> List[str]:
+    """Drop irrelevant messages and pack the rest into chunks of at most
+    `max_chars` characters, never splitting a message unless it alone is
+    larger than a chunk."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for message in split_messages(conversation):
+        if is_irrelevant(message):
+            continue
+        pieces = [message[i:i + max_chars] for i in range(0, len(message), max_chars)]
+        for piece in pieces:
+            if current and size + len(piece) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _is_empty(value) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() in EMPTY_VALUES
+    if isinstance(value, (int, float)):
+        return value == 0
+    return False
+
+
+def _dedupe_key(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+
+def _merge_texts(values: Iterable[str]) -> str:
+    seen = set()
+    merged = []
+    for value in values:
+        if not isinstance(value, str) or _is_empty(value):
+            continue
+        key = _dedupe_key(value)
+        if key and key not in seen:
+            seen.add(key)
+            merged.append(value.strip())
+    return " ".join(merged)
+
+
+def _merge_lists(values: Iterable[list]) -> List[str]:
+    seen = set()
+    merged = []
+    for items in values:
+        if isinstance(items, str):
+            items = [items]
+        for item in items or []:
+            if not isinstance(item, str) or _is_empty(item):
+                continue
+            key = _dedupe_key(item)
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(item.strip())
+    return merged
+
+
+def _merge_latest(values: Iterable[dict]) -> Dict:
+    # Chunks are in conversation order, so later values are the most recent
+    # agreement (e.g. a renegotiated deadline or budget) and win
+    merged: Dict = {}
+    for mapping in values:
+        for key, value in (mapping or {}).items():
+            if not _is_empty(value) or key not in merged:
+                merged[key] = value
+    return merged
+
+
+def merge_briefings(partials: List[dict]) -> dict:
+    """Reduce per-chunk briefings, in conversation order, into one briefing."""
+    return {
+        "objetivo": _merge_texts(p.get("objetivo") for p in partials),
+        "publico_alvo": _merge_texts(p.get("publico_alvo") for p in partials),
+        "referencias": _merge_lists(p.get("referencias") for p in partials),
+        "prazos": _merge_latest(p.get("prazos") for p in partials),
+        "orcamento": _merge_latest(p.get("orcamento") for p in partials),
+        "observacoes": _merge_lists(p.get("observacoes") for p in partials)
+    }
@@ -0,0 +1,76 @@
+import json
+from typing import Any, List, Tuple
+
+
+class IncrementalObjectParser:
+    """Parse a JSON object fed in chunks, emitting each top-level member as
+    soon as its value is complete.
+
+    Text before the first '{' (e.g. "Aqui está o briefing:") is ignored, as is
+    anything after the closing '}'. Every character is scanned exactly once,
+    so feeding a whole completion token by token stays linear.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._member: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.started = False
+        self.finished = False
+        self.result = {}
+
+    @property
+    def text(self) -> str:
+        """Raw text of the object seen so far."""
+        return "".join(self._buffer)
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume `chunk` and return the (key, value) pairs it completed."""
+        completed = []
+        for char in chunk:
+            if self.finished:
+                break
+            if not self.started:
+                if char == "{":
+                    self.started = True
+                    self._depth = 1
+                    self._buffer.append(char)
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                self._member.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._flush_member())
+                    self.finished = True
+                    continue
+            elif char == "," and self._depth == 1:
+                completed.extend(self._flush_member())
+                continue
+            self._member.append(char)
+        return completed
+
+    def _flush_member(self) -> List[Tuple[str, Any]]:
+        member = "".join(self._member).strip()
+        self._member = []
+        if not member:
+            return []
+        items = json.loads("{" + member + "}")
+        self.result.update(items)
+        return list(items.items())
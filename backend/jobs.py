@@ -0,0 +1,413 @@
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Collection, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from batch import is_retryable, retry_delay
+
+logger = logging.getLogger("briefing.jobs")
+
+ABANDONED_ERROR = "Worker stopped before the job finished, and no attempts are left"
+
+
+@dataclass
+class Job:
+    id: str
+    user_id: str
+    priority: int
+    status: str
+    payload: dict
+    attempts: int
+    created_at: float
+    updated_at: float
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    webhook_url: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"],
+            user_id=row["user_id"],
+            priority=row["priority"],
+            status=row["status"],
+            payload=json.loads(row["payload"]),
+            attempts=row["attempts"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            webhook_url=row["webhook_url"]
+        )
+
+
+class SQLiteJobStore:
+    """Durable job table. Jobs survive restarts: a job whose worker died
+    (its lease expired while `running`) is claimed again by the next worker,
+    in this process or any other sharing the file, until it runs out of
+    attempts."""
+
+    def __init__(self, path: str = "jobs.db"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript("""
+            pragma journal_mode = wal;
+            create table if not exists jobs (
+                seq integer primary key autoincrement,
+                id text unique not null,
+                user_id text not null,
+                priority integer not null default 0,
+                status text not null,
+                payload text not null,
+                webhook_url text,
+                attempts integer not null default 0,
+                run_after real not null,
+                lease_until real,
+                started_at real,
+                result text,
+                error text,
+                created_at real not null,
+                updated_at real not null
+            );
+            create index if not exists jobs_pending_idx on jobs(status, run_after);
+            -- When each user's last job started, kept apart so claims only
+            -- aggregate the active jobs, not the finished ones awaiting pruning
+            create table if not exists job_users (
+                user_id text primary key,
+                last_started real not null
+            );
+        """)
+
+    def enqueue(self, user_id: str, payload: dict, priority: int = 0, webhook_url: Optional[str] = None) -> Job:
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._conn.execute(
+                "insert into jobs (id, user_id, priority, status, payload, webhook_url, run_after, created_at, updated_at)"
+                " values (?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, user_id, priority, json.dumps(payload, ensure_ascii=False), webhook_url, now, now, now)
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("select * from jobs where id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def claim(self, lease: float, max_attempts: int) -> Optional[Job]:
+        """Mark the next runnable job as running and return it.
+
+        Higher priorities go first. Within a priority, users take turns:
+        users with fewer jobs running go first, then the user whose last job
+        started longest ago, so one user's backlog cannot starve the others.
+        Jobs with an expired lease are taken again only while they have
+        attempts left; see fail_abandoned.
+        """
+        now = time.time()
+        with self._lock:
+            # "begin immediate" serializes claims across processes sharing the file
+            self._conn.execute("begin immediate")
+            try:
+                row = self._conn.execute("""
+                    with users as (
+                        select user_id, sum(status = 'running' and lease_until >= :now) as running
+                        from jobs where status in ('queued', 'running') group by user_id
+                    )
+                    select jobs.id, jobs.user_id from jobs join users using (user_id)
+                    left join job_users using (user_id)
+                    where (status = 'queued' and run_after <= :now)
+                       or (status = 'running' and lease_until < :now and attempts < :max_attempts)
+                    order by priority desc, users.running, coalesce(job_users.last_started, 0), seq
+                    limit 1
+                """, {"now": now, "max_attempts": max_attempts}).fetchone()
+                if row is None:
+                    self._conn.execute("commit")
+                    return None
+                self._conn.execute(
+                    "update jobs set status = 'running', attempts = attempts + 1, lease_until = ?, started_at = ?,"
+                    " updated_at = ? where id = ?",
+                    (now + lease, now, now, row["id"])
+                )
+                self._conn.execute(
+                    "insert into job_users (user_id, last_started) values (?, ?)"
+                    " on conflict (user_id) do update set last_started = excluded.last_started",
+                    (row["user_id"], now)
+                )
+                self._conn.execute("commit")
+            except BaseException:
+                self._conn.execute("rollback")
+                raise
+            job = self._conn.execute("select * from jobs where id = ?", (row["id"],)).fetchone()
+        return Job.from_row(job)
+
+    def fail_abandoned(self, max_attempts: int) -> List[Job]:
+        """Mark as failed the jobs whose lease expired on their last attempt
+        (e.g. a payload that crashes its worker every time) and return them."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("begin immediate")
+            try:
+                ids = [row["id"] for row in self._conn.execute(
+                    "select id from jobs where status = 'running' and lease_until < ? and attempts >= ?",
+                    (now, max_attempts)
+                )]
+                self._conn.executemany(
+                    "update jobs set status = 'failed', error = ?, lease_until = null, updated_at = ? where id = ?",
+                    [(ABANDONED_ERROR, now, job_id) for job_id in ids]
+                )
+                self._conn.execute("commit")
+            except BaseException:
+                self._conn.execute("rollback")
+                raise
+            rows = [self._conn.execute("select * from jobs where id = ?", (job_id,)).fetchone() for job_id in ids]
+        return [Job.from_row(row) for row in rows]
+
+    def extend_lease(self, job_id: str, lease: float):
+        with self._lock:
+            self._conn.execute(
+                "update jobs set lease_until = ? where id = ? and status = 'running'",
+                (time.time() + lease, job_id)
+            )
+
+    def finish(self, job_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "update jobs set status = ?, result = ?, error = ?, lease_until = null, updated_at = ? where id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error,
+                 time.time(), job_id)
+            )
+
+    def retry_later(self, job_id: str, delay: float, error: Optional[str] = None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "update jobs set status = 'queued', run_after = ?, error = ?, lease_until = null, updated_at = ?"
+                " where id = ?",
+                (now + delay, error, now, job_id)
+            )
+
+    def release(self, job_id: str):
+        """Requeue a job interrupted by shutdown without counting the attempt."""
+        with self._lock:
+            self._conn.execute(
+                "update jobs set status = 'queued', attempts = max(attempts - 1, 0), run_after = ?,"
+                " lease_until = null where id = ? and status = 'running'",
+                (time.time(), job_id)
+            )
+
+    def prune(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "delete from jobs where status in ('done', 'failed') and updated_at < ?",
+                (time.time() - older_than,)
+            )
+            self._conn.execute("delete from job_users where user_id not in (select user_id from jobs)")
+        return cursor.rowcount
+
+    def next_run_after(self) -> Optional[float]:
+        """When the next delayed retry or expired lease becomes claimable."""
+        with self._lock:
+            row = self._conn.execute(
+                "select min(case status when 'queued' then run_after else lease_until end)"
+                " from jobs where status in ('queued', 'running')"
+            ).fetchone()
+        return row[0]
+
+
+class JobQueue:
+    """Pool of workers running queued jobs through `handler`.
+
+    Rate-limit and transient upstream errors are retried with backoff (as in
+    batch.run_batch) up to `max_attempts`; when a job ends, its webhook, if
+    any, receives the job status as JSON. Webhooks may only target hosts in
+    `webhook_allowed_hosts` or, without that list, public addresses.
+    """
+
+    def __init__(
+        self,
+        store: SQLiteJobStore,
+        handler: Callable[[Job], Awaitable[dict]],
+        workers: int = 4,
+        max_attempts: int = 4,
+        base_delay: float = 1.0,
+        lease: float = 120,
+        retention: float = 86400,
+        poll_interval: float = 1.0,
+        webhook_secret: Optional[str] = None,
+        webhook_allowed_hosts: Optional[Collection[str]] = None
+    ):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.lease = lease
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self.webhook_secret = webhook_secret
+        self.webhook_allowed_hosts = {host.lower() for host in webhook_allowed_hosts} if webhook_allowed_hosts else None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._webhooks: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._webhooks = httpx.AsyncClient(timeout=10)
+        pruned = await asyncio.to_thread(self.store.prune, self.retention)
+        if pruned:
+            logger.info("Jobs antigos removidos", extra={"jobs": pruned})
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._webhooks is not None:
+            await self._webhooks.aclose()
+
+    async def submit(self, user_id: str, payload: dict, priority: int = 0, webhook_url: Optional[str] = None) -> Job:
+        job = await asyncio.to_thread(self.store.enqueue, user_id, payload, priority, webhook_url)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self):
+        while True:
+            for job in await asyncio.to_thread(self.store.fail_abandoned, self.max_attempts):
+                logger.warning("Job abandonado sem tentativas restantes", extra={
+                    "job_id": job.id, "attempts": job.attempts
+                })
+                if job.webhook_url:
+                    await self._notify(job)
+            job = await asyncio.to_thread(self.store.claim, self.lease, self.max_attempts)
+            if job is None:
+                await self._idle()
+                continue
+            # Another worker may have work too; let it look
+            self._wakeup.set()
+            await self._run(job)
+
+    async def _idle(self):
+        self._wakeup.clear()
+        timeout = self.poll_interval
+        next_run = await asyncio.to_thread(self.store.next_run_after)
+        if next_run is not None:
+            timeout = min(timeout, max(next_run - time.time(), 0.01))
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _keep_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await asyncio.to_thread(self.store.extend_lease, job_id, self.lease)
+
+    async def _run(self, job: Job):
+        heartbeat = asyncio.create_task(self._keep_lease(job.id))
+        try:
+            result = await self.handler(job)
+        except asyncio.CancelledError:
+            # Shutting down: give the job back right away instead of waiting for the lease
+            self.store.release(job.id)
+            raise
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e) or e.__class__.__name__
+            if job.attempts < self.max_attempts and is_retryable(e):
+                delay = retry_delay(e, job.attempts, self.base_delay)
+                logger.warning("Job falhou, nova tentativa agendada", extra={
+                    "job_id": job.id, "error": e.__class__.__name__, "attempt": job.attempts, "delay": round(delay, 2)
+                })
+                await asyncio.to_thread(self.store.retry_later, job.id, delay, error)
+                return
+            logger.warning("Job falhou", extra={"job_id": job.id, "error": error, "attempts": job.attempts})
+            await asyncio.to_thread(self.store.finish, job.id, "failed", None, error)
+        else:
+            await asyncio.to_thread(self.store.finish, job.id, "done", result)
+            logger.info("Job concluído", extra={"job_id": job.id, "attempts": job.attempts})
+        finally:
+            heartbeat.cancel()
+
+        if job.webhook_url:
+            await self._notify(await self.get(job.id))
+
+    async def check_webhook_url(self, url: str):
+        """Raise ValueError unless `url` may receive webhooks: an http(s) URL
+        whose host is allow-listed or, with no allow-list, resolves only to
+        public addresses, so jobs cannot reach the server's own network
+        (loopback, private, link-local or cloud metadata addresses)."""
+        try:
+            parts = urlsplit(url)
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+        except ValueError:
+            parts, port = None, None
+        if parts is None or parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError("webhook_url must be an http(s) URL")
+        host = parts.hostname.lower()
+        if self.webhook_allowed_hosts is not None:
+            if host not in self.webhook_allowed_hosts:
+                raise ValueError("webhook_url host is not allowed")
+            return
+        try:
+            addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror:
+            raise ValueError("webhook_url host does not resolve")
+        for *_, sockaddr in addresses:
+            address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+            if not address.is_global or address.is_multicast:
+                raise ValueError("webhook_url must point to a public address")
+
+    async def _notify(self, job: Job):
+        # Checked again at send time: the host may resolve elsewhere by now
+        try:
+            await self.check_webhook_url(job.webhook_url)
+        except ValueError as e:
+            logger.warning("Webhook recusado", extra={"job_id": job.id, "error": str(e)})
+            return
+        body = json.dumps(job_view(job), ensure_ascii=False).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.webhook_secret:
+            signature = hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Webhook-Signature"] = f"sha256={signature}"
+        for attempt in range(1, 4):
+            try:
+                response = await self._webhooks.post(job.webhook_url, content=body, headers=headers)
+                if response.status_code < 500:
+                    return
+                logger.warning("Webhook respondeu com erro", extra={"job_id": job.id, "status": response.status_code})
+            except httpx.HTTPError as e:
+                logger.warning("Falha ao chamar webhook", extra={"job_id": job.id, "error": str(e)})
+            await asyncio.sleep(self.base_delay * 2 ** (attempt - 1))
+
+
+def job_view(job: Job) -> dict:
+    """Public representation of a job, as returned by GET /jobs/{id}."""
+    return {
+        "id": job.id,
+        "status": job.status,
+        "user_id": job.user_id,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "created_at": datetime.fromtimestamp(job.created_at, timezone.utc).isoformat(),
+        "updated_at": datetime.fromtimestamp(job.updated_at, timezone.utc).isoformat(),
+        "result": job.result,
+        "error": job.error
+    }
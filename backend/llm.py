@@ -0,0 +1,507 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+import groq
+import httpx
+from fastapi import HTTPException
+from groq import AsyncGroq
+
+from batch import Overloaded, is_rate_limited, retry_delay
+from metrics import observe_groq_call, observe_phase, record_token_usage
+
+logger = logging.getLogger("briefing.llm")
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+@dataclass
+class Completion:
+    text: str
+    provider: str
+    model: str
+    usage: Optional[Usage] = None
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Whether `error` says the provider is unhealthy: a 5xx, a timeout or
+    unreachable server, or a rate limit. A 4xx rejects that one request
+    (e.g. Groq's json_validate_failed) and says nothing about the provider."""
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    if isinstance(error, groq.APIConnectionError):
+        return True
+    if isinstance(error, HTTPException):
+        # As raised here: 429 rate limit, 503 upstream 5xx or unreachable,
+        # 504 timeout; 502 is an upstream 4xx
+        return error.status_code in (429, 503, 504)
+    return False
+
+
+class ProviderStats:
+    """Rolling latency and error statistics of one provider.
+
+    Latency is tracked both as an EWMA and as a window of recent samples for
+    percentiles; errors as an EWMA of the failure rate. Rate limits and runs
+    of consecutive failures open a circuit that keeps the provider out of
+    routing until `open_until`.
+    """
+
+    def __init__(self, window: int = 256, alpha: float = 0.2, failure_threshold: int = 3, cooldown: float = 30):
+        self.samples = deque(maxlen=window)
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self.samples.append(latency)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += self.alpha * (latency - self.latency_ewma)
+        self.error_rate *= 1 - self.alpha
+        self.consecutive_failures = 0
+
+    def record_failure(self, error: BaseException):
+        self.requests += 1
+        self.failures += 1
+        self.error_rate += self.alpha * (1 - self.error_rate)
+        self.consecutive_failures += 1
+        if is_rate_limited(error):
+            self.open_until = max(self.open_until, time.monotonic() + retry_delay(error, 1, 1.0))
+        elif self.consecutive_failures >= self.failure_threshold:
+            self.open_until = max(self.open_until, time.monotonic() + self.cooldown)
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "error_rate": round(self.error_rate, 4),
+            "latency_ewma": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+            "latency_p50": self.percentile(50),
+            "latency_p95": self.percentile(95),
+            "available": self.available
+        }
+
+
+class Provider(abc.ABC):
+    """One model on one backend, with its own concurrency limit and stats.
+
+    `min_chars`/`max_chars` bound the prompt sizes routed to it, and the
+    per-1k-token costs rank it against other providers that can take the
+    same prompt. With `admission` set, each call also holds one of the
+    admission controller's global slots, shared by every provider and
+    process.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        max_concurrency: int = 8,
+        queue_timeout: float = 30,
+        timeout: float = 60,
+        temperature: float = 0.3,
+        max_tokens: int = 2000,
+        json_mode: bool = False,
+        min_chars: int = 0,
+        max_chars: Optional[int] = None,
+        cost_per_1k_input: float = 0.0,
+        cost_per_1k_output: float = 0.0,
+        admission=None
+    ):
+        self.name = name
+        self.model = model
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.json_mode = json_mode
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.cost_per_1k_input = cost_per_1k_input
+        self.cost_per_1k_output = cost_per_1k_output
+        self.admission = admission
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = ProviderStats()
+
+    def accepts(self, prompt: str) -> bool:
+        return len(prompt) >= self.min_chars and (self.max_chars is None or len(prompt) <= self.max_chars)
+
+    def estimated_cost(self, prompt: str) -> float:
+        # ~4 characters per token; the answer is bounded by max_tokens
+        return (len(prompt) / 4 * self.cost_per_1k_input + self.max_tokens * self.cost_per_1k_output) / 1000
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of this provider's concurrent request slots, then a
+        global admission slot."""
+        try:
+            with observe_phase("queue_wait"):
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Fila de geração cheia", extra={"provider": self.name, "queue_timeout": self.queue_timeout})
+            raise Overloaded("Too many briefings being generated, try again later", self.queue_timeout)
+        try:
+            async with self.admission.slot("generate") if self.admission else nullcontext():
+                yield
+        finally:
+            self.semaphore.release()
+
+    async def complete(self, prompt: str, json_mode: bool = False) -> Completion:
+        """Send a prompt, respecting the concurrency limit and timeout."""
+        async with self.slot():
+            started = time.perf_counter()
+            try:
+                with observe_phase("upstream_wait"), observe_groq_call(self.model):
+                    completion = await asyncio.wait_for(
+                        self._complete(prompt, json_mode and self.json_mode),
+                        timeout=self.timeout
+                    )
+            except asyncio.TimeoutError:
+                error = HTTPException(status_code=504, detail="Model response timed out")
+                self.stats.record_failure(error)
+                raise error
+            except Exception as e:
+                if is_provider_failure(e):
+                    self.stats.record_failure(e)
+                raise
+            self.stats.record_success(time.perf_counter() - started)
+            record_token_usage(self.model, completion.usage)
+            return completion
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the text deltas of a streamed completion."""
+        async with self.slot():
+            started = time.perf_counter()
+            deadline = asyncio.get_running_loop().time() + self.timeout
+            try:
+                with observe_groq_call(self.model):
+                    async for delta in self._stream(prompt):
+                        if asyncio.get_running_loop().time() > deadline:
+                            raise HTTPException(status_code=504, detail="Model response timed out")
+                        yield delta
+            except Exception as e:
+                if is_provider_failure(e):
+                    self.stats.record_failure(e)
+                raise
+            self.stats.record_success(time.perf_counter() - started)
+
+    @abc.abstractmethod
+    async def _complete(self, prompt: str, json_mode: bool) -> Completion:
+        """Send one prompt to the backend and return its answer."""
+
+    @abc.abstractmethod
+    def _stream(self, prompt: str) -> AsyncIterator[str]:
+        """Yield the text deltas of one streamed answer from the backend."""
+
+    async def close(self):
+        pass
+
+
+class GroqProvider(Provider):
+    def __init__(self, name: str, model: str, api_key: Optional[str] = None, base_url: Optional[str] = None, **options):
+        super().__init__(name, model, **options)
+        # base_url None lets the SDK read GROQ_BASE_URL
+        self.client = AsyncGroq(api_key=api_key, base_url=base_url, timeout=self.timeout)
+
+    async def _complete(self, prompt: str, json_mode: bool) -> Completion:
+        completion = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            response_format={"type": "json_object"} if json_mode else None,
+            stream=False
+        )
+        usage = completion.usage
+        return Completion(
+            text=completion.choices[0].message.content or "",
+            provider=self.name,
+            model=self.model,
+            usage=Usage(usage.prompt_tokens or 0, usage.completion_tokens or 0) if usage else None
+        )
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        with observe_phase("upstream_wait"):
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True
+            )
+        try:
+            async for chunk in stream:
+                # Groq reports usage on the last chunk, under x_groq
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None:
+                    record_token_usage(self.model, x_groq.usage)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        finally:
+            await stream.response.aclose()
+
+    async def close(self):
+        await self.client.close()
+
+
+class OpenAICompatibleProvider(Provider):
+    """Any server speaking the OpenAI chat completions API (vLLM, Ollama,
+    llama.cpp, LM Studio...), e.g. a local model for development."""
+
+    def __init__(self, name: str, model: str, base_url: str, api_key: Optional[str] = None, **options):
+        super().__init__(name, model, **options)
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.client = httpx.AsyncClient(base_url=base_url.rstrip("/"), headers=headers, timeout=self.timeout)
+
+    def _body(self, prompt: str, stream: bool, json_mode: bool = False) -> dict:
+        body = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stream": stream
+        }
+        if json_mode:
+            body["response_format"] = {"type": "json_object"}
+        return body
+
+    @staticmethod
+    def _check(response: httpx.Response):
+        # Surface upstream failures as the HTTP errors batch.is_retryable knows
+        if response.status_code == 429:
+            raise HTTPException(
+                status_code=429,
+                detail="Model provider rate limit",
+                headers={"Retry-After": response.headers.get("retry-after", "1")}
+            )
+        if response.status_code >= 500:
+            raise HTTPException(status_code=503, detail=f"Model provider error {response.status_code}")
+        if response.status_code >= 400:
+            raise HTTPException(status_code=502, detail=f"Model provider rejected the request: {response.text[:200]}")
+
+    async def _complete(self, prompt: str, json_mode: bool) -> Completion:
+        try:
+            response = await self.client.post("/chat/completions", json=self._body(prompt, False, json_mode))
+        except httpx.TransportError as e:
+            raise HTTPException(status_code=503, detail=f"Model provider unreachable: {e}")
+        self._check(response)
+        data = response.json()
+        usage = data.get("usage")
+        return Completion(
+            text=data["choices"][0]["message"].get("content") or "",
+            provider=self.name,
+            model=self.model,
+            usage=Usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)) if usage else None
+        )
+
+    async def _stream(self, prompt: str) -> AsyncIterator[str]:
+        with observe_phase("upstream_wait"):
+            request = self.client.build_request("POST", "/chat/completions", json=self._body(prompt, True))
+            try:
+                response = await self.client.send(request, stream=True)
+            except httpx.TransportError as e:
+                raise HTTPException(status_code=503, detail=f"Model provider unreachable: {e}")
+        try:
+            if response.status_code >= 400:
+                await response.aread()
+                self._check(response)
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                chunk = json.loads(payload)
+                if chunk.get("usage"):
+                    record_token_usage(self.model, Usage(
+                        chunk["usage"].get("prompt_tokens", 0), chunk["usage"].get("completion_tokens", 0)
+                    ))
+                choices = chunk.get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    yield delta
+        finally:
+            await response.aclose()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+PROVIDER_KINDS = {"groq": GroqProvider, "openai": OpenAICompatibleProvider}
+
+
+def load_providers(config: List[dict], defaults: dict) -> List[Provider]:
+    """Build providers from LLM_PROVIDERS entries such as
+
+        {"name": "local", "kind": "openai", "model": "llama3.1",
+         "base_url": "http://localhost:11434/v1", "max_chars": 20000}
+
+    `api_key_env` names the variable holding the key; other keys are
+    Provider options and override `defaults`.
+    """
+    providers = []
+    for entry in config:
+        entry = dict(entry)
+        kind = entry.pop("kind", "groq")
+        if kind not in PROVIDER_KINDS:
+            raise ValueError(f"Unknown LLM provider kind {kind!r}; expected one of {sorted(PROVIDER_KINDS)}")
+        api_key_env = entry.pop("api_key_env", "GROQ_API_KEY" if kind == "groq" else None)
+        api_key = os.getenv(api_key_env) if api_key_env else None
+        entry.setdefault("name", entry.get("model"))
+        providers.append(PROVIDER_KINDS[kind](api_key=api_key, **{**defaults, **entry}))
+    if not providers:
+        raise ValueError("LLM_PROVIDERS must list at least one provider")
+    return providers
+
+
+class LLMRouter:
+    """Routes prompts across providers.
+
+    Candidates are the providers whose size range accepts the prompt, ranked
+    by open circuit, then high recent error rate, then estimated cost, then
+    EWMA latency. A failed call fails over to the next candidate. With
+    `hedge_percentile` set, a call still running past that latency
+    percentile of its provider starts a second call on the next candidate
+    (or the same provider) and the first answer wins.
+    """
+
+    def __init__(
+        self,
+        providers: List[Provider],
+        hedge_percentile: float = 0,
+        hedge_min_samples: int = 20,
+        unhealthy_error_rate: float = 0.5
+    ):
+        self.providers = providers
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the configured models, for cache keys."""
+        return ",".join(sorted(provider.model for provider in self.providers))
+
+    def candidates(self, prompt: str) -> List[Provider]:
+        eligible = [provider for provider in self.providers if provider.accepts(prompt)]
+        if not eligible:
+            # Nothing is sized for this prompt; the largest-context providers are the best bet
+            eligible = [provider for provider in self.providers if provider.max_chars is None] or self.providers
+        return sorted(eligible, key=lambda provider: (
+            not provider.stats.available,
+            provider.stats.error_rate > self.unhealthy_error_rate,
+            provider.estimated_cost(prompt),
+            provider.stats.latency_ewma or 0.0
+        ))
+
+    async def complete(self, prompt: str, json_mode: bool = False) -> Completion:
+        candidates = self.candidates(prompt)
+        last_error: Optional[BaseException] = None
+        for index, provider in enumerate(candidates):
+            backup = candidates[index + 1] if index + 1 < len(candidates) else provider
+            try:
+                return await self._hedged(provider, backup, prompt, json_mode)
+            except Exception as e:
+                last_error = e
+                if index + 1 < len(candidates):
+                    logger.warning("Falha no provedor, tentando o próximo", extra={
+                        "provider": provider.name, "error": e.__class__.__name__, "next": candidates[index + 1].name
+                    })
+        raise last_error
+
+    async def _hedged(self, provider: Provider, backup: Provider, prompt: str, json_mode: bool) -> Completion:
+        hedge_after = None
+        if self.hedge_percentile and len(provider.stats.samples) >= self.hedge_min_samples:
+            hedge_after = provider.stats.percentile(self.hedge_percentile)
+        if hedge_after is None:
+            return await provider.complete(prompt, json_mode)
+
+        primary = asyncio.create_task(provider.complete(prompt, json_mode))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return primary.result()
+            self.hedges += 1
+            logger.info("Requisição lenta, enviando pedido paralelo", extra={
+                "provider": provider.name, "backup": backup.name, "hedge_after": round(hedge_after, 3)
+            })
+            secondary = asyncio.create_task(backup.complete(prompt, json_mode))
+            pending.add(secondary)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Both failed; report the primary's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream from the best candidate, failing over only until the first
+        delta has been sent; after that, errors reach the caller."""
+        candidates = self.candidates(prompt)
+        for index, provider in enumerate(candidates):
+            started = False
+            try:
+                async for delta in provider.stream(prompt):
+                    started = True
+                    yield delta
+                return
+            except Exception as e:
+                if started or index + 1 == len(candidates):
+                    raise
+                logger.warning("Falha no provedor, tentando o próximo", extra={
+                    "provider": provider.name, "error": e.__class__.__name__, "next": candidates[index + 1].name
+                })
+
+    def stats(self) -> dict:
+        return {
+            "providers": {
+                provider.name: {"model": provider.model, **provider.stats.snapshot()}
+                for provider in self.providers
+            },
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
+
+    async def close(self):
+        for provider in self.providers:
+            await provider.close()
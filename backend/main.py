@@ -1,19 +1,92 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, Dict, List
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError, TypeAdapter
+from typing import Optional, Dict, List, Literal, Tuple, Union, Awaitable, AsyncIterator, TypeVar
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import logging
 import os
+import sys
+import uuid
 from dotenv import load_dotenv
 import json
-from datetime import datetime
-from supabase import create_client
-from groq import Groq
+from datetime import date, datetime
+from admission import (
+    AdmissionController, AdmissionMiddleware, Limit, MemoryAdmissionStore, SQLiteAdmissionStore, request_identity
+)
+from incremental_json import IncrementalObjectParser
+from parsing import coerce_briefing, coerce_field, default_briefing_field, parse_json_object
+from preprocess import preprocess_conversation
+from briefing_cache import BriefingCache, SQLiteCacheStore, cache_key
+from chunking import chunk_conversation, merge_briefings
+from batch import run_batch
+from jobs import Job, JobQueue, SQLiteJobStore, job_view
+from llm import Completion, LLMRouter, load_providers
+from search import SearchQuery
+from repository import SQLiteBriefingRepository, SupabaseBriefingRepository, WriteBehindQueue
+from structured_logging import configure_logging
+from metrics import (
+    BRIEFING_PARSE, CONVERSATION_TOKENS, MetricsMiddleware, monitor_event_loop, observe_db, observe_phase,
+    register_cache, register_llm, render_metrics
+)
 
 # Load environment variables
 load_dotenv()
 
+configure_logging()
+logger = logging.getLogger("briefing")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if job_queue is not None:
+        await job_queue.start()
+    loop_monitor = asyncio.create_task(monitor_event_loop())
+    yield
+    loop_monitor.cancel()
+    if job_queue is not None:
+        # Running jobs go back to the queue and are resumed on the next start
+        await job_queue.close()
+    await llm_router.close()
+    # Save briefings still waiting in the write-behind queue before exiting
+    await briefing_writer.close()
+    await briefing_repository.close()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Admission control: token buckets per caller and endpoint group, overridable
+# with ADMISSION_LIMITS ({"generate": {"rate": 1, "burst": 20}, ...}), and a
+# cap on upstream model calls in progress across workers (ADMISSION_STORE=sqlite)
+# or in this process (memory); calls are shed past ADMISSION_QUEUE_TARGET
+ADMISSION_LIMITS = {
+    "generate": Limit(rate=0.5, burst=10),
+    "batch": Limit(rate=1, burst=1000),
+    "save": Limit(rate=2, burst=20),
+    "read": Limit(rate=10, burst=50),
+    **{
+        endpoint: Limit(**limit)
+        for endpoint, limit in json.loads(os.getenv("ADMISSION_LIMITS") or "{}").items()
+    }
+}
+if os.getenv("ADMISSION_STORE", "memory") == "sqlite":
+    admission_store = SQLiteAdmissionStore(os.getenv("ADMISSION_SQLITE_PATH", "admission.db"))
+else:
+    admission_store = MemoryAdmissionStore()
+admission = AdmissionController(
+    admission_store,
+    ADMISSION_LIMITS if os.getenv("ADMISSION_ENABLED", "1") == "1" else {},
+    max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32")),
+    queue_target=float(os.getenv("ADMISSION_QUEUE_TARGET", "5"))
+)
+# Added first so it runs inside CORS and metrics, which then see its 429s; it
+# applies the "generate" limit to both generation routes
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=admission,
+    routes=[("POST", "/generate-briefing"), ("POST", "/generate-briefing/stream")]
+)
 
 # Configure CORS
 app.add_middleware(
@@ -24,19 +97,150 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"]
 )
+app.add_middleware(MetricsMiddleware, routes_app=app.router)
+
+# Initialize briefing storage: Supabase, or a local SQLite stand-in
+# (BRIEFING_STORE=sqlite) for development and tests without a Supabase project
+if os.getenv("BRIEFING_STORE", "supabase") == "sqlite":
+    briefing_repository = SQLiteBriefingRepository(os.getenv("BRIEFING_SQLITE_PATH", ":memory:"))
+else:
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_KEY")
+
+    if not supabase_url or not supabase_key:
+        raise ValueError("Supabase URL and key must be set in environment variables")
 
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
+    briefing_repository = SupabaseBriefingRepository(
+        supabase_url,
+        supabase_key,
+        pool_size=int(os.getenv("SUPABASE_POOL_SIZE", "20")),
+        keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30")),
+        timeout=float(os.getenv("SUPABASE_TIMEOUT", "10"))
+    )
 
-if not supabase_url or not supabase_key:
-    raise ValueError("Supabase URL and key must be set in environment variables")
+# Single saves issued within WRITE_BATCH_DELAY seconds share one bulk insert
+briefing_writer = WriteBehindQueue(
+    briefing_repository,
+    max_batch=int(os.getenv("WRITE_BATCH_SIZE", "50")),
+    max_delay=float(os.getenv("WRITE_BATCH_DELAY", "0.02"))
+)
+
+# Briefing search runs where the briefings are: Postgres full-text search for
+# Supabase, the FTS5 index of the SQLite store. A local index next to Supabase
+# would only hold the briefings saved by this process, so it is refused.
+if os.getenv("SEARCH_BACKEND", "postgres") == "sqlite" and not isinstance(briefing_repository, SQLiteBriefingRepository):
+    raise ValueError("SEARCH_BACKEND=sqlite requires BRIEFING_STORE=sqlite")
+
+# Initialize model providers
+GROQ_MODEL = os.getenv("GROQ_MODEL", "meta-llama/llama-4-scout-17b-16e-instruct")
+GROQ_TEMPERATURE = 0.3
+# Maximum number of simultaneous upstream calls; further requests wait in line
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+# Seconds a request may wait for a free slot before being rejected with 503
+GROQ_QUEUE_TIMEOUT = float(os.getenv("GROQ_QUEUE_TIMEOUT", "30"))
+# Seconds allowed for a single upstream call
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+# Seconds between checks for a disconnected HTTP client
+DISCONNECT_POLL_INTERVAL = 0.5
+# Ask for a JSON object answer (Groq JSON mode); set to 0 for models without it.
+# Streaming requests never use it, as Groq does not stream in JSON mode.
+GROQ_JSON_MODE = os.getenv("GROQ_JSON_MODE", "1") == "1"
+
+# Providers to route between, as a JSON list (see llm.load_providers); the
+# GROQ_* settings above are their defaults. Without it, GROQ_MODEL on Groq.
+LLM_PROVIDERS = json.loads(os.getenv("LLM_PROVIDERS") or "[]") or [{"name": "groq", "kind": "groq", "model": GROQ_MODEL}]
+# Send a second, hedged request when a call runs past this latency
+# percentile of its provider (e.g. 95); 0 disables hedging
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+
+llm_router = LLMRouter(
+    load_providers(LLM_PROVIDERS, {
+        "max_concurrency": GROQ_MAX_CONCURRENCY,
+        "queue_timeout": GROQ_QUEUE_TIMEOUT,
+        "timeout": GROQ_TIMEOUT,
+        "temperature": GROQ_TEMPERATURE,
+        "json_mode": GROQ_JSON_MODE,
+        # Requests, batch items and jobs all share the global cap
+        "admission": admission
+    }),
+    hedge_percentile=LLM_HEDGE_PERCENTILE
+)
+register_llm(llm_router.stats)
+
+# Bump whenever build_briefing_prompt changes so cached briefings are not reused
+PROMPT_VERSION = "2"
+
+# Initialize briefing cache (BRIEFING_CACHE_DB enables the persistent SQLite tier)
+cache_db_path = os.getenv("BRIEFING_CACHE_DB")
+briefing_cache = BriefingCache(
+    max_entries=int(os.getenv("BRIEFING_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("BRIEFING_CACHE_TTL", "3600")),
+    store=SQLiteCacheStore(cache_db_path) if cache_db_path else None
+)
+register_cache(briefing_cache.stats)
 
-# Initialize Supabase client
-supabase = create_client(supabase_url, supabase_key)
+# Compact conversations (timestamps, system lines, noise, duplicates, quoted
+# emails) before they go into a prompt; the budget is the number of
+# conversation tokens a single prompt is expected to hold
+PREPROCESS_CONVERSATIONS = os.getenv("PREPROCESS_CONVERSATIONS", "1") == "1"
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "4000"))
 
-# Initialize Groq client
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Conversations longer than this are split into chunks, extracted in parallel and merged
+LONG_CONVERSATION_CHARS = int(os.getenv("LONG_CONVERSATION_CHARS", "16000"))
+CHUNK_CHARS = int(os.getenv("CHUNK_CHARS", "12000"))
+
+# Batch generation: parallel workers, upper bound on items, rows per bulk insert
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(GROQ_MAX_CONCURRENCY)))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_SAVE_SIZE = int(os.getenv("BATCH_SAVE_SIZE", "50"))
+
+# Background jobs (POST /generate-briefing?async=true), kept in the SQLite file
+# JOB_DB so they survive restarts; finished jobs are deleted after JOB_RETENTION
+# seconds. Off unless JOB_DB is set: serverless deployments have no writable
+# disk and no process that outlives a request to run the workers.
+JOB_DB = os.getenv("JOB_DB")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(GROQ_MAX_CONCURRENCY)))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "4"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))
+# Optional key for the X-Webhook-Signature HMAC sent with job webhooks
+JOB_WEBHOOK_SECRET = os.getenv("JOB_WEBHOOK_SECRET")
+# Comma-separated hosts webhooks may target; when unset, any host with only
+# public addresses (never loopback, private or link-local ones)
+JOB_WEBHOOK_ALLOWED_HOSTS = [host.strip() for host in os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()]
+
+# Page size of GET /briefings/{user_id}
+LIST_DEFAULT_LIMIT = 20
+LIST_MAX_LIMIT = 100
+
+T = TypeVar("T")
+
+
+async def create_completion(prompt: str) -> Completion:
+    """Send a prompt to the best available model provider."""
+    return await llm_router.complete(prompt, json_mode=True)
+
+
+def stream_completion(prompt: str) -> AsyncIterator[str]:
+    """Yield the text deltas of a streamed completion."""
+    return llm_router.stream(prompt)
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """Await `awaitable`, cancelling it if the HTTP client goes away first."""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Cliente desconectou, cancelando geração")
+                task.cancel()
+                # 499 is the de-facto "client closed request" status
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
 
 @app.get("/")
 async def root():
@@ -61,20 +265,40 @@ class SavedBriefing(BaseModel):
     user_id: str
     created_at: Optional[str] = None
 
+class BriefingSummary(BaseModel):
+    id: str
+    titulo: str
+    created_at: str
+    conteudo: Dict
+
 class SaveBriefingInput(BaseModel):
     briefing: BriefingResponse
     user_id: str
 
-@app.post("/generate-briefing", response_model=BriefingResponse)
-async def generate_briefing(conversation_input: ConversationInput):
-    try:
-        print("Iniciando geração de briefing...")
-        print(f"Conversa recebida: {conversation_input.conversation[:100]}...")
-        
-        prompt = f"""Extraia um briefing profissional da seguinte conversa com um cliente. O briefing deve conter: Objetivo, Público-alvo, Referências, Prazos, Orçamento e Observações extras. Ignore mensagens irrelevantes.
+class JobStatus(BaseModel):
+    id: str
+    status: Literal["queued", "running", "done", "failed"]
+    user_id: str
+    priority: int
+    attempts: int
+    created_at: str
+    updated_at: str
+    # {"briefing": {...}} when done, plus "saved" (id, created_at) when saved
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
 
+def build_briefing_prompt(conversation: str, part: Optional[Tuple[int, int]] = None) -> str:
+    if part is None:
+        scope = ""
+    else:
+        scope = f"""
+Este é o trecho {part[0]} de {part[1]} de uma conversa longa. Extraia apenas o que aparece neste trecho e deixe vazios ("", [] ou 0.0) os campos sem informação.
+"""
+    return f"""Extraia um briefing profissional da seguinte conversa com um cliente. O briefing deve conter: Objetivo, Público-alvo, Referências, Prazos, Orçamento e Observações extras. Ignore mensagens irrelevantes.
+{scope}
 Conversa:
-{conversation_input.conversation}
+{conversation}
 
 Por favor, forneça APENAS o JSON, sem nenhum texto adicional. O formato deve ser:
 {{
@@ -92,87 +316,571 @@ Por favor, forneça APENAS o JSON, sem nenhum texto adicional. O formato deve se
     }},
     "observacoes": ["observação 1", "observação 2", "..."]
 }}"""
-        
-        print("Enviando requisição para a API Groq...")
-        completion = groq_client.chat.completions.create(
-            model="meta-llama/llama-4-scout-17b-16e-instruct",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=2000,
-            stream=False
+
+
+# Expected shape of each field, used when re-asking for specific fields
+FIELD_FORMATS = {
+    "objetivo": '"descrição clara do objetivo principal"',
+    "publico_alvo": '"descrição do público-alvo"',
+    "referencias": '["referência 1", "referência 2", "..."]',
+    "prazos": '{"inicio": "data de início", "entrega": "data de entrega", "etapas_intermediarias": "datas importantes"}',
+    "orcamento": '{"total": 0.0, "por_etapa": 0.0}',
+    "observacoes": '["observação 1", "observação 2", "..."]'
+}
+
+
+def build_field_repair_prompt(conversation: str, fields: List[str], partial: dict) -> str:
+    """Prompt asking again for only the fields that were missing or malformed."""
+    template = ",\n".join(f'    "{field}": {FIELD_FORMATS[field]}' for field in fields)
+    extracted = json.dumps(partial, ensure_ascii=False) if partial else "{}"
+    return f"""Você já extraiu parte de um briefing da conversa abaixo, mas os campos {", ".join(fields)} ficaram faltando ou em formato inválido.
+
+Conversa:
+{conversation}
+
+Já extraído:
+{extracted}
+
+Responda APENAS com um JSON contendo somente esses campos, sem nenhum texto adicional. Valores numéricos de orçamento devem ser números, sem "R$". O formato deve ser:
+{{
+{template}
+}}"""
+
+
+def ndjson_line(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+def briefing_cache_key(conversation: str) -> str:
+    return cache_key(conversation, llm_router.fingerprint, GROQ_TEMPERATURE, PROMPT_VERSION)
+
+async def complete_briefing(conversation: str, briefing_text: str, reask: bool = True) -> dict:
+    """Turn the model's answer into BriefingResponse fields.
+
+    Common defects (code fences, prose, trailing commas, truncation, amounts
+    like "R$ 5.000,00") are repaired locally. Fields still missing or invalid
+    are asked for again in one short call when `reask` is set, instead of
+    resubmitting the whole prompt; what is left gets an empty value.
+    Raises ValueError when the answer holds no JSON object at all.
+    """
+    with observe_phase("parse"):
+        data, repaired = parse_json_object(briefing_text)
+        if data is None:
+            raise ValueError("JSON não encontrado na resposta")
+        briefing_data, invalid = coerce_briefing(data)
+    outcome = "repaired" if repaired or any(value != data.get(field) for field, value in briefing_data.items()) else "ok"
+
+    if invalid and reask:
+        logger.info("Campos ausentes ou inválidos, pedindo novamente", extra={"fields": invalid})
+        outcome = "reasked"
+        completion = await create_completion(build_field_repair_prompt(conversation, invalid, briefing_data))
+        with observe_phase("parse"):
+            repair_data, _ = parse_json_object(completion.text)
+            repaired_fields, _ = coerce_briefing(repair_data or {})
+        for field in list(invalid):
+            if field in repaired_fields:
+                briefing_data[field] = repaired_fields[field]
+                invalid.remove(field)
+
+    if invalid:
+        if reask:
+            logger.warning("Campos preenchidos com valor vazio", extra={"fields": invalid})
+        for field in invalid:
+            briefing_data[field] = default_briefing_field(field)
+    BRIEFING_PARSE.labels(outcome).inc()
+    return briefing_data
+
+async def extract_briefing(conversation: str, part: Optional[Tuple[int, int]] = None) -> dict:
+    with observe_phase("prompt_build"):
+        prompt = build_briefing_prompt(conversation, part)
+
+    logger.info("Enviando requisição para a API Groq", extra={"prompt_chars": len(prompt), "part": part})
+    completion = await create_completion(prompt)
+
+    briefing_text = completion.text
+    logger.info("Resposta recebida", extra={
+        "provider": completion.provider,
+        "response_chars": len(briefing_text),
+        "prompt_tokens": completion.usage.prompt_tokens if completion.usage else None,
+        "completion_tokens": completion.usage.completion_tokens if completion.usage else None
+    })
+
+    # Extrair apenas a parte JSON da resposta; trechos de conversas longas
+    # podem ter campos vazios, então não são pedidos novamente
+    try:
+        return await complete_briefing(conversation, briefing_text, reask=part is None)
+    except ValueError as e:
+        BRIEFING_PARSE.labels("failed").inc()
+        logger.warning("Erro ao fazer parse do JSON", extra={"error": str(e), "response": briefing_text})
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to parse model response as JSON"
         )
-        
-        briefing_text = completion.choices[0].message.content
-        print(f"Resposta recebida: {briefing_text[:100]}...")
-        
-        # Extrair apenas a parte JSON da resposta
+
+async def extract_long_briefing(conversation: str) -> dict:
+    """Map-reduce extraction: one call per chunk, run in parallel, then merged."""
+    chunks = chunk_conversation(conversation, CHUNK_CHARS)
+    if not chunks:
+        # Nothing survived the noise filter; let the model see the raw text
+        return await extract_briefing(conversation)
+    if len(chunks) == 1:
+        return await extract_briefing(chunks[0])
+
+    logger.info("Conversa longa dividida em trechos", extra={"chars": len(conversation), "chunks": len(chunks)})
+    results = await asyncio.gather(
+        *(extract_briefing(chunk, (i + 1, len(chunks))) for i, chunk in enumerate(chunks)),
+        return_exceptions=True
+    )
+    partials = [result for result in results if isinstance(result, dict)]
+    if not partials:
+        raise next(result for result in results if isinstance(result, BaseException))
+    if len(partials) < len(chunks):
+        logger.warning("Trechos falharam e foram ignorados", extra={"failed_chunks": len(chunks) - len(partials)})
+    return merge_briefings(partials)
+
+async def compact_conversation(conversation: str) -> str:
+    if not PREPROCESS_CONVERSATIONS:
+        return conversation
+    with observe_phase("preprocess"):
+        if len(conversation) > LONG_CONVERSATION_CHARS:
+            # Tens of milliseconds on large exports; keep them off the event loop
+            result = await asyncio.to_thread(preprocess_conversation, conversation, PROMPT_TOKEN_BUDGET)
+        else:
+            result = preprocess_conversation(conversation, PROMPT_TOKEN_BUDGET)
+    CONVERSATION_TOKENS.labels("raw").observe(result.tokens_before)
+    CONVERSATION_TOKENS.labels("compacted").observe(result.tokens_after)
+    details = {
+        "format": result.format,
+        "messages_before": result.messages_before,
+        "messages_after": result.messages_after,
+        "tokens_before": result.tokens_before,
+        "tokens_after": result.tokens_after,
+        "token_budget": PROMPT_TOKEN_BUDGET
+    }
+    if result.over_budget:
+        logger.warning("Conversa acima do orçamento de tokens", extra=details)
+    else:
+        logger.info("Conversa pré-processada", extra=details)
+    return result.text
+
+async def generate_briefing_data(conversation: str, preprocessed: bool = False) -> dict:
+    """Generate and validate a briefing, returning it as a plain dict."""
+    if not preprocessed:
+        conversation = await compact_conversation(conversation)
+    if len(conversation) > LONG_CONVERSATION_CHARS:
+        briefing_data = await extract_long_briefing(conversation)
+    else:
+        briefing_data = await extract_briefing(conversation)
+    with observe_phase("validation"):
+        briefing = BriefingResponse(**briefing_data)
+    logger.info("Briefing gerado com sucesso")
+    return briefing.dict()
+
+async def run_briefing_job(job: Job) -> dict:
+    briefing_data = await generate_cached_briefing(job.payload["conversation"])
+    result = {"briefing": briefing_data}
+    if job.payload.get("save"):
+        saved = await store_briefing(BriefingResponse(**briefing_data), job.user_id)
+        result["saved"] = {"id": saved["id"], "created_at": saved["created_at"]}
+    return result
+
+JOBS_DISABLED = "Background jobs are disabled; set JOB_DB to enable async=true"
+
+job_queue = JobQueue(
+    SQLiteJobStore(JOB_DB),
+    run_briefing_job,
+    workers=JOB_WORKERS,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    lease=GROQ_TIMEOUT * 2,
+    retention=JOB_RETENTION,
+    webhook_secret=JOB_WEBHOOK_SECRET,
+    webhook_allowed_hosts=JOB_WEBHOOK_ALLOWED_HOSTS
+) if JOB_DB else None
+
+@app.post(
+    "/generate-briefing",
+    response_model=BriefingResponse,
+    responses={202: {"model": JobStatus, "description": "Job queued (async=true)"}}
+)
+async def generate_briefing(
+    conversation_input: ConversationInput,
+    request: Request,
+    run_async: bool = Query(False, alias="async", description="Queue the generation and return a job to poll"),
+    save: bool = Query(False, description="With async=true, also save the briefing once generated"),
+    priority: int = Query(0, ge=-10, le=10, description="With async=true, higher priorities run first"),
+    webhook_url: Optional[str] = Query(None, description="With async=true, URL that receives the job when it ends")
+):
+    if run_async:
+        if job_queue is None:
+            raise HTTPException(status_code=501, detail=JOBS_DISABLED)
+        if webhook_url is not None:
+            try:
+                await job_queue.check_webhook_url(webhook_url)
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+        job = await job_queue.submit(
+            conversation_input.user_id,
+            {"conversation": conversation_input.conversation, "save": save},
+            priority,
+            webhook_url
+        )
+        logger.info("Job de briefing enfileirado", extra={"job_id": job.id, "user_id": job.user_id, "priority": priority})
+        return JSONResponse(status_code=202, content=job_view(job), headers={"Location": f"/jobs/{job.id}"})
+
+    try:
+        logger.info("Iniciando geração de briefing", extra={
+            "user_id": conversation_input.user_id,
+            "conversation_chars": len(conversation_input.conversation)
+        })
+
+        key = briefing_cache_key(conversation_input.conversation)
+        briefing_data = await cancel_on_disconnect(
+            request,
+            briefing_cache.get_or_compute(key, lambda: generate_briefing_data(conversation_input.conversation))
+        )
+        return BriefingResponse(**briefing_data)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Erro inesperado ao gerar briefing")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/generate-briefing/stream")
+async def generate_briefing_stream(conversation_input: ConversationInput):
+    """Stream the briefing as NDJSON events.
+
+    Emits `token` events with the raw model output as it arrives, a `field`
+    event as soon as each BriefingResponse field is complete, and finally a
+    `briefing` event with the validated payload (or an `error` event).
+    Field values are coerced like the final briefing's, so they keep their
+    type; fields that cannot be coerced only arrive in `briefing`.
+    """
+    key = briefing_cache_key(conversation_input.conversation)
+
+    async def events():
+        parser = IncrementalObjectParser()
+        chunks = []
         try:
-            # Encontrar o início do JSON (primeira ocorrência de '{')
-            json_start = briefing_text.find('{')
-            if json_start == -1:
-                raise ValueError("JSON não encontrado na resposta")
-            
-            # Encontrar o fim do JSON (última ocorrência de '}')
-            json_end = briefing_text.rfind('}') + 1
-            if json_end == 0:
-                raise ValueError("JSON não encontrado na resposta")
-            
-            # Extrair apenas a parte JSON
-            json_text = briefing_text[json_start:json_end]
-            briefing_data = json.loads(json_text)
-            print("Briefing gerado com sucesso!")
-            return BriefingResponse(**briefing_data)
-        except json.JSONDecodeError as e:
-            print(f"Erro ao fazer parse do JSON: {str(e)}")
-            print(f"Texto que causou o erro: {json_text if 'json_text' in locals() else briefing_text}")
+            conversation = await compact_conversation(conversation_input.conversation)
+            if len(conversation) > LONG_CONVERSATION_CHARS:
+                # Partial extractions are merged at the end, so there is nothing to stream early
+                briefing_data = await briefing_cache.get_or_compute(
+                    key, lambda: generate_briefing_data(conversation, preprocessed=True)
+                )
+                for field, value in briefing_data.items():
+                    yield ndjson_line({"type": "field", "field": field, "value": value})
+                yield ndjson_line({"type": "briefing", "briefing": briefing_data})
+                return
+
+            cached = await briefing_cache.get(key)
+            if cached is not None:
+                for field, value in cached.items():
+                    yield ndjson_line({"type": "field", "field": field, "value": value})
+                yield ndjson_line({"type": "briefing", "briefing": cached})
+                return
+
+            async for delta in stream_completion(build_briefing_prompt(conversation)):
+                chunks.append(delta)
+                yield ndjson_line({"type": "token", "content": delta})
+                if parser is None:
+                    continue
+                try:
+                    fields = parser.feed(delta)
+                except ValueError:
+                    # Keep streaming tokens; the full text is parsed at the end
+                    logger.warning("Falha no parse incremental, aguardando resposta completa")
+                    parser = None
+                    continue
+                for field, value in fields:
+                    value = coerce_field(field, value)
+                    if value is not None:
+                        yield ndjson_line({"type": "field", "field": field, "value": value})
+
+            briefing_data = await complete_briefing(conversation, "".join(chunks))
+            with observe_phase("validation"):
+                briefing = BriefingResponse(**briefing_data)
+            await briefing_cache.store_value(key, briefing.dict())
+            yield ndjson_line({"type": "briefing", "briefing": briefing.dict()})
+        except HTTPException as e:
+            yield ndjson_line({"type": "error", "status": e.status_code, "detail": e.detail})
+        except (ValueError, ValidationError) as e:
+            BRIEFING_PARSE.labels("failed").inc()
+            logger.warning("Erro ao fazer parse do JSON", extra={"error": str(e), "response": "".join(chunks)})
+            yield ndjson_line({"type": "error", "status": 500, "detail": "Failed to parse model response as JSON"})
+        except Exception as e:
+            logger.exception("Erro inesperado ao gerar briefing")
+            yield ndjson_line({"type": "error", "status": 500, "detail": str(e)})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+conversation_list = TypeAdapter(List[ConversationInput])
+
+def parse_conversation_ndjson(text: str) -> List[ConversationInput]:
+    items = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(ConversationInput.model_validate_json(line))
+        except ValidationError as e:
             raise HTTPException(
-                status_code=500,
-                detail="Failed to parse model response as JSON"
+                status_code=422,
+                detail={"line": line_number, "errors": e.errors(include_url=False)}
             )
-        
-    except Exception as e:
-        print(f"Erro inesperado: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return items
+
+async def read_batch_items(request: Request) -> List[ConversationInput]:
+    """Accept a JSON list (or {"items": [...]}), an NDJSON body or an NDJSON file upload."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=422, detail="Expected an NDJSON file in the 'file' field")
+        items = parse_conversation_ndjson((await upload.read()).decode("utf-8"))
+    elif content_type.startswith(("application/x-ndjson", "application/jsonl", "text/plain")):
+        items = parse_conversation_ndjson((await request.body()).decode("utf-8"))
+    else:
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=422, detail="Body must be JSON or NDJSON")
+        if isinstance(payload, dict):
+            payload = payload.get("items")
+        try:
+            items = conversation_list.validate_python(payload)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    if not items:
+        raise HTTPException(status_code=422, detail="Batch is empty")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch limited to {BATCH_MAX_ITEMS} items")
+    return items
+
+async def insert_briefings(rows: List[dict]) -> List[dict]:
+    """Insert many briefings in a single round trip."""
+    with observe_phase("db_write"), observe_db("insert_many"):
+        saved = await briefing_repository.insert_many(rows)
+    return saved
+
+async def generate_cached_briefing(conversation: str) -> dict:
+    key = briefing_cache_key(conversation)
+    return await briefing_cache.get_or_compute(key, lambda: generate_briefing_data(conversation))
+
+async def batch_events(items: List[ConversationInput], save: bool) -> AsyncIterator[dict]:
+    """Generate briefings for `items`, yielding one event per finished item and,
+    when `save` is set, one `saved` event per bulk insert."""
+    pending = []
+
+    async def flush():
+        indexes = [index for index, _ in pending]
+        rows = [row for _, row in pending]
+        pending.clear()
+        try:
+            saved = await insert_briefings(rows)
+            return {
+                "type": "saved",
+                "items": [{"index": index, "id": row["id"]} for index, row in zip(indexes, saved)]
+            }
+        except Exception as e:
+            logger.exception("Erro ao salvar briefings em lote", extra={"rows": len(rows)})
+            return {"type": "error", "indexes": indexes, "status": 500, "detail": str(e)}
+
+    async for index, briefing_data, error in run_batch(
+        items, lambda item: generate_cached_briefing(item.conversation), workers=BATCH_WORKERS
+    ):
+        if error is not None:
+            status = error.status_code if isinstance(error, HTTPException) else 500
+            detail = error.detail if isinstance(error, HTTPException) else str(error)
+            yield {"type": "error", "index": index, "status": status, "detail": detail}
+            continue
+
+        yield {"type": "briefing", "index": index, "briefing": briefing_data}
+        if save:
+            pending.append((index, briefing_row(BriefingResponse(**briefing_data), items[index].user_id)))
+            if len(pending) >= BATCH_SAVE_SIZE:
+                yield await flush()
+
+    if pending:
+        yield await flush()
+
+@app.post("/generate-briefings/batch")
+async def generate_briefings_batch(request: Request, save: bool = False):
+    """Generate many briefings at once, streaming NDJSON events as each finishes.
+
+    The body is a JSON list of ConversationInput items, an NDJSON body or an
+    NDJSON file uploaded as `file`. With `save=true` the results are stored in
+    bulk, one insert per BATCH_SAVE_SIZE briefings.
+    """
+    items = await read_batch_items(request)
+    # Charged per item, so one large batch counts like many single requests
+    await admission.check("batch", await request_identity(request), cost=len(items))
+
+    async def events():
+        async for event in batch_events(items, save):
+            yield ndjson_line(event)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/jobs/{job_id}", response_model=JobStatus, dependencies=[Depends(admission.limit("read"))])
+async def get_job(job_id: str):
+    if job_queue is None:
+        raise HTTPException(status_code=501, detail=JOBS_DISABLED)
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobStatus(**job_view(job))
 
-@app.post("/briefings", response_model=SavedBriefing)
+@app.get("/cache/stats")
+async def cache_stats():
+    return briefing_cache.stats()
+
+@app.get("/llm/stats")
+async def llm_stats():
+    return llm_router.stats()
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+def briefing_row(briefing: BriefingResponse, user_id: str) -> dict:
+    # Generate title based on current date/time and first few words of objective
+    title = f"Briefing {datetime.now().strftime('%d/%m/%Y %H:%M')} - {briefing.objetivo[:30]}..."
+    return {
+        "titulo": title,
+        "conteudo": briefing.dict(),
+        "user_id": user_id
+    }
+
+async def store_briefing(briefing: BriefingResponse, user_id: str) -> dict:
+    # Save to Supabase
+    data = briefing_row(briefing, user_id)
+
+    with observe_phase("db_write"), observe_db("insert"):
+        saved = await briefing_writer.insert(data)
+    return saved
+
+@app.post("/briefings", response_model=SavedBriefing, dependencies=[Depends(admission.limit("save"))])
 async def save_briefing(save_input: SaveBriefingInput):
     try:
-        # Generate title based on current date/time and first few words of objective
-        title = f"Briefing {datetime.now().strftime('%d/%m/%Y %H:%M')} - {save_input.briefing.objetivo[:30]}..."
-        
-        # Save to Supabase
-        data = {
-            "titulo": title,
-            "conteudo": save_input.briefing.dict(),
-            "user_id": save_input.user_id
-        }
-        
-        result = supabase.table("briefings").insert(data).execute()
-        
-        if not result.data:
-            raise HTTPException(status_code=500, detail="Failed to save briefing")
-            
+        saved = await store_briefing(save_input.briefing, save_input.user_id)
+
         return SavedBriefing(
-            id=result.data[0]["id"],
-            titulo=result.data[0]["titulo"],
-            conteudo=result.data[0]["conteudo"],
-            user_id=result.data[0]["user_id"],
-            created_at=result.data[0]["created_at"]
+            id=saved["id"],
+            titulo=saved["titulo"],
+            conteudo=saved["conteudo"],
+            user_id=saved["user_id"],
+            created_at=saved["created_at"]
         )
         
     except Exception as e:
-        print(f"Erro ao salvar briefing: {str(e)}")
+        logger.exception("Erro ao salvar briefing", extra={"user_id": save_input.user_id})
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get(
+    "/briefings/{user_id}/search",
+    response_model=List[SavedBriefing],
+    dependencies=[Depends(admission.limit("read"))]
+)
+async def search_briefings(
+    user_id: str,
+    q: Optional[str] = Query(None, description="Keywords matched against titulo, objetivo, publico_alvo, observacoes and referencias"),
+    orcamento_min: Optional[float] = None,
+    orcamento_max: Optional[float] = None,
+    entrega_de: Optional[date] = Query(None, description="Earliest prazos.entrega (YYYY-MM-DD)"),
+    entrega_ate: Optional[date] = Query(None, description="Latest prazos.entrega (YYYY-MM-DD)"),
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT)
+):
+    try:
+        with observe_db("search"):
+            rows = await briefing_repository.search(SearchQuery(
+                user_id=user_id,
+                text=q,
+                orcamento_min=orcamento_min,
+                orcamento_max=orcamento_max,
+                entrega_from=entrega_de,
+                entrega_to=entrega_ate,
+                limit=limit
+            ))
+        return [
+            SavedBriefing(
+                id=item["id"],
+                titulo=item["titulo"],
+                conteudo=item["conteudo"],
+                user_id=item["user_id"],
+                created_at=item["created_at"]
+            )
+            for item in rows
+        ]
+    except Exception as e:
+        logger.exception("Erro ao buscar briefings", extra={"user_id": user_id})
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/briefings/{user_id}", response_model=List[SavedBriefing])
-async def list_briefings(user_id: str):
+def encode_cursor(created_at: str, briefing_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, briefing_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not (isinstance(value, list) and len(value) == 2 and all(isinstance(part, str) for part in value)):
+            raise ValueError("cursor must hold a timestamp and an id")
+        created_at, briefing_id = value
+        # Validates the timestamp so it can be safely embedded in the filter
+        datetime.fromisoformat(created_at)
+        return created_at, str(uuid.UUID(briefing_id))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get(
+    "/briefings/{user_id}",
+    response_model=List[Union[SavedBriefing, BriefingSummary]],
+    dependencies=[Depends(admission.limit("read"))]
+)
+async def list_briefings(
+    user_id: str,
+    response: Response,
+    limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = Query(None, description="Comma-separated conteudo fields for the summary view")
+):
+    """List a user's briefings, newest first, one page at a time.
+
+    Pages are keyset-paginated on (created_at, id): pass the X-Next-Cursor
+    header of a response as `cursor` to get the next page. `view=summary`
+    returns only id, titulo, created_at and the requested conteudo `fields`.
+    """
+    summary_fields = []
+    if fields:
+        summary_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = set(summary_fields) - set(BriefingResponse.model_fields)
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
     try:
-        result = supabase.table("briefings")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .order("created_at", desc=True)\
-            .execute()
-            
+        after = decode_cursor(cursor) if cursor else None
+        # One extra row tells whether there is a next page
+        with observe_db("list"):
+            data = await briefing_repository.list_page(
+                user_id, limit + 1, after, summary_fields if view == "summary" else None
+            )
+
+        rows = data[:limit]
+        if len(data) > limit:
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+        if view == "summary":
+            return [
+                BriefingSummary(
+                    id=item["id"],
+                    titulo=item["titulo"],
+                    created_at=item["created_at"],
+                    conteudo={field: item[field] for field in summary_fields}
+                )
+                for item in rows
+            ]
         return [
             SavedBriefing(
                 id=item["id"],
@@ -181,11 +889,42 @@ async def list_briefings(user_id: str):
                 user_id=item["user_id"],
                 created_at=item["created_at"]
             )
-            for item in result.data
+            for item in rows
         ]
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("Erro ao listar briefings", extra={"user_id": user_id})
         raise HTTPException(status_code=500, detail=str(e))
 
+async def run_batch_cli(input_path: str, output, save: bool):
+    if input_path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(input_path, encoding="utf-8") as f:
+            text = f.read()
+    items = parse_conversation_ndjson(text)
+    async for event in batch_events(items, save):
+        output.write(ndjson_line(event))
+        output.flush()
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Briefing Generator API")
+    subcommands = parser.add_subparsers(dest="command")
+    batch_parser = subcommands.add_parser("batch", help="generate briefings for an NDJSON file of conversations")
+    batch_parser.add_argument("input", help="NDJSON file with one {conversation, user_id} per line, or - for stdin")
+    batch_parser.add_argument("-o", "--output", default="-", help="where to write NDJSON results (default: stdout)")
+    batch_parser.add_argument("--save", action="store_true", help="store the briefings in Supabase")
+    args = parser.parse_args()
+
+    if args.command == "batch":
+        output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        # Logs go to stderr, so stdout stays valid NDJSON
+        asyncio.run(run_batch_cli(args.input, output, args.save))
+        if output is not sys.stdout:
+            output.close()
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
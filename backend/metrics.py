@@ -0,0 +1,196 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Briefing generation takes seconds, so the default buckets stop too early
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency, until the last body byte is sent",
+    ["method", "endpoint", "status"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served", ["method", "endpoint"]
+)
+GROQ_REQUEST_DURATION = Histogram(
+    "groq_request_duration_seconds", "Latency of Groq chat completion calls",
+    ["model", "outcome"], buckets=LATENCY_BUCKETS
+)
+GROQ_TOKENS = Counter("groq_tokens_total", "Tokens reported by Groq", ["model", "kind"])
+GROQ_IN_FLIGHT = Gauge("groq_requests_in_flight", "Groq calls currently in progress")
+BRIEFING_PARSE = Counter("briefing_parse_total", "Parsing of model responses into briefings", ["outcome"])
+SUPABASE_QUERY_DURATION = Histogram(
+    "supabase_query_duration_seconds", "Latency of Supabase queries", ["operation", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+PHASE_DURATION = Histogram(
+    "briefing_phase_duration_seconds",
+    "Time spent per phase of the briefing hot path "
+    "(admission_wait, preprocess, prompt_build, queue_wait, upstream_wait, parse, validation, db_write)",
+    ["phase"], buckets=LATENCY_BUCKETS
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests refused by admission control", ["endpoint", "reason"]
+)
+CONVERSATION_TOKENS = Histogram(
+    "briefing_conversation_tokens", "Estimated conversation tokens before and after preprocessing",
+    ["stage"], buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late the event loop runs a timer; high values mean blocking code",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+
+async def monitor_event_loop(interval: float = 0.1):
+    """Sleep `interval` seconds in a loop and record how much later than
+    that the loop woke up. Runs until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - started - interval))
+
+
+@contextmanager
+def observe_phase(phase: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_DURATION.labels(phase).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def observe_groq_call(model: str):
+    started = time.perf_counter()
+    outcome = "error"
+    GROQ_IN_FLIGHT.inc()
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        GROQ_IN_FLIGHT.dec()
+        GROQ_REQUEST_DURATION.labels(model, outcome).observe(time.perf_counter() - started)
+
+
+def record_token_usage(model: str, usage):
+    if usage is None:
+        return
+    GROQ_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens or 0)
+    GROQ_TOKENS.labels(model, "completion").inc(usage.completion_tokens or 0)
+
+
+@contextmanager
+def observe_db(operation: str):
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        SUPABASE_QUERY_DURATION.labels(operation, outcome).observe(time.perf_counter() - started)
+
+
+class CacheCollector:
+    """Exports the counters of a BriefingCache at scrape time."""
+
+    def __init__(self, stats: Callable[[], dict]):
+        self.stats = stats
+
+    def collect(self):
+        stats = self.stats()
+        requests = CounterMetricFamily("briefing_cache_requests", "Briefing cache lookups", labels=["result"])
+        requests.add_metric(["hit"], stats["hits"])
+        requests.add_metric(["miss"], stats["misses"])
+        requests.add_metric(["coalesced"], stats["coalesced"])
+        yield requests
+        yield GaugeMetricFamily("briefing_cache_hit_ratio", "Share of cache lookups served from cache", value=stats["hit_ratio"])
+        yield GaugeMetricFamily("briefing_cache_entries", "Briefings held in the in-process cache", value=stats["entries"])
+
+
+def register_cache(stats: Callable[[], dict]):
+    REGISTRY.register(CacheCollector(stats))
+
+
+class LLMCollector:
+    """Exports the per-provider statistics of an LLMRouter at scrape time."""
+
+    def __init__(self, stats: Callable[[], dict]):
+        self.stats = stats
+
+    def collect(self):
+        stats = self.stats()
+        latency = GaugeMetricFamily(
+            "llm_provider_latency_ewma_seconds", "Moving average latency per model provider", labels=["provider"]
+        )
+        errors = GaugeMetricFamily(
+            "llm_provider_error_rate", "Moving average failure rate per model provider", labels=["provider"]
+        )
+        available = GaugeMetricFamily(
+            "llm_provider_available", "1 unless the provider's circuit is open", labels=["provider"]
+        )
+        for name, provider in stats["providers"].items():
+            latency.add_metric([name], provider["latency_ewma"] or 0.0)
+            errors.add_metric([name], provider["error_rate"])
+            available.add_metric([name], 1.0 if provider["available"] else 0.0)
+        yield latency
+        yield errors
+        yield available
+        yield CounterMetricFamily("llm_hedged_requests", "Hedged second requests sent", value=stats["hedges"])
+
+
+def register_llm(stats: Callable[[], dict]):
+    REGISTRY.register(LLMCollector(stats))
+
+
+def render_metrics():
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (unlike BaseHTTPMiddleware it sees the end of
+    streamed responses) recording latency and in-flight requests per route."""
+
+    def __init__(self, app: ASGIApp, routes_app=None):
+        self.app = app
+        self.routes_app = routes_app
+
+    def _endpoint(self, scope: Scope) -> Optional[str]:
+        # Label by route template ("/briefings/{user_id}") to keep cardinality bounded
+        for route in getattr(self.routes_app, "routes", []):
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        endpoint = self._endpoint(scope) or "unmatched"
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, endpoint)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(method, endpoint, status).observe(time.perf_counter() - started)
@@ -0,0 +1,8 @@
+-- Upgrades a database created with an earlier supabase_schema.sql for the
+-- keyset pagination of GET /briefings/{user_id}. Safe to run more than once.
+
+-- Serves user_id = ? order by created_at desc, id desc
+create index if not exists briefings_user_created_idx on briefings(user_id, created_at desc, id desc);
+
+-- Superseded: the index above also serves user_id lookups
+drop index if exists briefings_user_id_idx;
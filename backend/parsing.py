@@ -0,0 +1,239 @@
+import json
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+TEXT_FIELDS = ("objetivo", "publico_alvo")
+LIST_FIELDS = ("referencias", "observacoes")
+BRIEFING_FIELDS = ("objetivo", "publico_alvo", "referencias", "prazos", "orcamento", "observacoes")
+
+CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+MONEY = re.compile(r"(-?\d[\d.,]*)\s*(mil|k|mi|milh[õo]es|milh[ãa]o)?\b", re.IGNORECASE)
+MULTIPLIERS = {"mil": 1e3, "k": 1e3, "mi": 1e6, "milhão": 1e6, "milhao": 1e6, "milhões": 1e6, "milhoes": 1e6}
+ONLY_DATE = re.compile(r"^\s*(\d{1,2}[/.-]\d{1,2}[/.-]\d{4}|\d{4}-\d{2}-\d{2}(T[\d:.+Z-]*)?)\s*$")
+DATE_BR = re.compile(r"(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})")
+DATE_ISO = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+
+def _scan(text: str):
+    """Yield (index, char, in_string, stack) for each char, with the string
+    and bracket state after that char (a closing quote is outside the string)."""
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+        yield index, char, in_string, stack
+
+
+def _close_truncated(text: str) -> Optional[dict]:
+    """Recover the longest valid prefix of a JSON object cut off mid-way
+    (e.g. by max_tokens). When the cut fell inside a member's value, that
+    member is dropped, as its value may be incomplete; members followed by
+    a comma or by the cut itself are kept."""
+    cut_points = []
+    in_string = False
+    stack: List[str] = []
+    for index, char, in_string, stack in _scan(text):
+        if in_string:
+            continue
+        if char in ",{[":
+            # Cut before a comma, or right after an opening bracket; only a
+            # cut inside a nested value leaves the last member incomplete
+            position = index if char == "," else index + 1
+            cut_points.append((position, "".join(reversed(stack)), len(stack) > 1))
+        elif not stack:
+            # The object is complete; what follows is prose
+            text = text[:index + 1]
+            break
+    # Cut right after a top-level member whose value visibly ended (closing
+    # quote or bracket, literal): that member is complete too. A number may
+    # have lost digits ("50" of "500"), so it is not.
+    end = text.rstrip().rstrip(",").rstrip()
+    complete = not in_string and len(stack) <= 1 and end.endswith(('"', "}", "]", "true", "false", "null"))
+    candidates = [(text + ('"' if in_string else "") + "".join(reversed(stack)), not complete)]
+    candidates += [(text[:position] + tail, nested) for position, tail, nested in reversed(cut_points)]
+    for candidate, incomplete in candidates:
+        try:
+            data = json.loads(TRAILING_COMMA.sub(r"\1", candidate))
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        if data and incomplete:
+            data.pop(list(data)[-1])
+        return data
+    return None
+
+
+def parse_json_object(text: str) -> Tuple[Optional[dict], bool]:
+    """Parse the JSON object in a model answer, tolerating code fences,
+    surrounding prose, smart quotes, trailing commas and truncation.
+
+    Returns (data, repaired); data is None when no object could be recovered.
+    """
+    if "```" in text:
+        fenced = CODE_FENCE.search(text)
+        if fenced and "{" in fenced.group(1):
+            text = fenced.group(1)
+    start = text.find("{")
+    if start == -1:
+        return None, False
+    # raw_decode stops at the end of the object, whatever prose (braces
+    # included) follows it
+    decoder = json.JSONDecoder()
+    try:
+        data, _ = decoder.raw_decode(text, start)
+        if isinstance(data, dict):
+            return data, False
+    except json.JSONDecodeError:
+        pass
+
+    body = text[start:].translate(SMART_QUOTES)
+    try:
+        data, _ = decoder.raw_decode(TRAILING_COMMA.sub(r"\1", body))
+        if isinstance(data, dict):
+            return data, True
+    except json.JSONDecodeError:
+        pass
+    return _close_truncated(body), True
+
+
+def parse_briefing_date(value) -> Optional[date]:
+    """Best-effort date from a prazo string ("30/04/2025", "2025-04-30",
+    "até 30/04/2025"); None when it holds no recognizable date.
+
+    Mirrors briefing_parse_date() in supabase_schema.sql.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        if match := DATE_ISO.search(value):
+            return date(int(match[1]), int(match[2]), int(match[3]))
+        if match := DATE_BR.search(value):
+            return date(int(match[3]), int(match[2]), int(match[1]))
+    except ValueError:
+        pass
+    return None
+
+
+def parse_money(value) -> Optional[float]:
+    """Amount from a number or a Brazilian currency string ("R$ 5.000,00",
+    "5 mil", "R$ 2,5k"); None when there is no amount in it."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = MONEY.search(value.replace("\u00a0", " "))
+    if not match:
+        return None
+    number, multiplier = match.group(1).rstrip(".,"), match.group(2)
+    if "," in number:
+        # Brazilian format: "." groups thousands, "," separates decimals
+        number = number.replace(".", "").replace(",", ".")
+    elif number.count(".") > 1 or re.fullmatch(r"-?\d{1,3}\.\d{3}", number):
+        number = number.replace(".", "")
+    try:
+        amount = float(number)
+    except ValueError:
+        return None
+    if multiplier:
+        amount *= MULTIPLIERS.get(multiplier.lower(), 1)
+    return amount
+
+
+def _as_text(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return "; ".join(text for item in value if (text := _as_text(item)))
+    if isinstance(value, dict):
+        return "; ".join(f"{key}: {text}" for key, item in value.items() if (text := _as_text(item)))
+    return str(value)
+
+
+def _as_list(value) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        items = re.split(r"\n|;|\s-\s", value)
+        return [item.strip(" -•*") for item in items if item.strip(" -•*")]
+    if isinstance(value, list):
+        return [text for item in value if (text := _as_text(item))]
+    if isinstance(value, dict):
+        return [text for text in (_as_text(item) for item in value.values()) if text]
+    return [str(value)]
+
+
+def _as_prazo(value) -> str:
+    text = _as_text(value) or ""
+    if ONLY_DATE.match(text):
+        parsed = parse_briefing_date(text)
+        if parsed:
+            return parsed.strftime("%d/%m/%Y")
+    return text
+
+
+def coerce_field(field: str, value):
+    """Coerce one model answer field into its BriefingResponse type; None
+    when it is missing, could not be coerced or is not a briefing field."""
+    if field in TEXT_FIELDS:
+        return _as_text(value) or None
+    if field in LIST_FIELDS:
+        return _as_list(value)
+    if field == "prazos":
+        if isinstance(value, dict):
+            return {str(key): _as_prazo(item) for key, item in value.items()}
+        if isinstance(value, str) and parse_briefing_date(value):
+            return {"entrega": _as_prazo(value)}
+        return None
+    if field == "orcamento":
+        if isinstance(value, dict):
+            # Unknown amounts ("a combinar") become 0.0, like the prompt's template
+            return {str(key): parse_money(item) or 0.0 for key, item in value.items()}
+        amount = parse_money(value)
+        return {"total": amount} if amount is not None else None
+    return None
+
+
+def coerce_briefing(data: dict) -> Tuple[dict, List[str]]:
+    """Coerce a parsed model answer into BriefingResponse types.
+
+    Returns the coerced fields and the names of fields that are missing or
+    could not be coerced, which need to be asked again.
+    """
+    result = {}
+    invalid = []
+    for field in BRIEFING_FIELDS:
+        value = coerce_field(field, data.get(field))
+        if value is None:
+            invalid.append(field)
+        else:
+            result[field] = value
+    return result, invalid
+
+
+def default_briefing_field(field: str):
+    if field in TEXT_FIELDS:
+        return ""
+    if field in LIST_FIELDS:
+        return []
+    return {}
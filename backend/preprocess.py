@@ -0,0 +1,267 @@
+import json
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from chunking import NOISE, has_content, split_messages
+
+# "12/03/2024 10:15 - Ana: ..." (Android) and "[12/03/24, 10:15:00] Ana: ..." (iOS)
+WHATSAPP_ANDROID = re.compile(
+    r"^\u200e?(\d{1,2}/\d{1,2}/\d{2,4}),?\s+\d{1,2}:\d{2}(?::\d{2})?(?:\s?[APap]\.?\s?[Mm]\.?)?\s+-\s+(.*)$"
+)
+WHATSAPP_IOS = re.compile(
+    r"^\u200e?\[(\d{1,2}/\d{1,2}/\d{2,4}),?\s+\d{1,2}:\d{2}(?::\d{2})?(?:\s?[APap]\.?\s?[Mm]\.?)?\]\s+(.*)$"
+)
+# Telegram Desktop text export: "Ana Souza, [12.03.24 10:15]" then the message lines
+TELEGRAM_HEADER = re.compile(r"^(.{1,60}?),\s+\[\d{1,2}\.\d{1,2}\.\d{2,4}\s+\d{1,2}:\d{2}(?::\d{2})?\]\s*$")
+EMAIL_HEADER = re.compile(r"^(From|De|To|Para|Cc|Date|Data|Sent|Enviado(?: em)?|Subject|Assunto):\s*(.*)$", re.IGNORECASE)
+EMAIL_QUOTE_INTRO = re.compile(
+    r"^(On .+ wrote:|Em .+ escreveu:|-+\s*(Original Message|Mensagem original)\s*-+)\s*$", re.IGNORECASE
+)
+SIGNATURE = re.compile(
+    r"^(--\s*|_{3,}|att\.?,?|atenciosamente,?|abs\.?,?|abraços?,?|cordialmente,?|best regards,?|regards,?"
+    r"|enviado do meu .*|sent from my .*|get outlook for .*)$",
+    re.IGNORECASE
+)
+SPEAKER = re.compile(r"^([^\s:][^:\n]{0,40}):\s+(.*)$", re.DOTALL)
+PHONE = re.compile(r"^\+?[\d\s().-]{8,}$")
+TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+LONG_WORD = re.compile(r"\w{8,}")
+NON_WORD = re.compile(r"[\W_]+")
+# Shorter messages ("sim", "ok", "não pode") are answers, repeated on purpose
+MIN_DEDUPE_CHARS = 20
+
+# Whole lines written by the app rather than by a participant
+SYSTEM_LINE = re.compile(
+    r"\b(end-to-end encrypted|criptografia de ponta a ponta|created group|criou o grupo|added|adicionou"
+    r"|removed|removeu|left|saiu|joined using|entrou usando|changed the (subject|group)|mudou o (assunto|nome)"
+    r"|changed this group|alterou|security code|código de segurança|missed (voice|video) call"
+    r"|chamada de (voz|vídeo) perdida|pinned a message|fixou uma mensagem)\b",
+    re.IGNORECASE
+)
+# Markers the apps append to a message body
+INLINE_MARKERS = re.compile(
+    r"\s*(<this message was edited>|<mensagem editada>|<editado>|\(editado\)|<attached: [^>]*>"
+    r"|\u200e|\(arquivo anexado\)|\(file attached\))\s*",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class Message:
+    speaker: Optional[str]
+    text: str
+
+
+@dataclass
+class PreprocessResult:
+    text: str
+    format: str
+    messages_before: int
+    messages_after: int
+    tokens_before: int
+    tokens_after: int
+    token_budget: Optional[int] = None
+
+    @property
+    def over_budget(self) -> bool:
+        return self.token_budget is not None and self.tokens_after > self.token_budget
+
+    @property
+    def reduction(self) -> float:
+        return 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for Llama-family tokenizers: words, with long words
+    split in pieces, plus punctuation. Within ~10% of the real count on
+    Portuguese chat text, which is enough to size prompts."""
+    pieces = len(TOKEN_PIECE.findall(text))
+    return pieces + sum(len(word) // 8 for word in LONG_WORD.findall(text))
+
+
+def _parse_whatsapp(lines: List[str]) -> List[Message]:
+    messages: List[Message] = []
+    for line in lines:
+        match = WHATSAPP_ANDROID.match(line) or WHATSAPP_IOS.match(line)
+        if match:
+            body = match.group(2)
+            speaker = SPEAKER.match(body)
+            if speaker:
+                messages.append(Message(speaker.group(1).strip(), speaker.group(2)))
+            else:
+                # "Ana added Bruno", "Messages are end-to-end encrypted"...
+                messages.append(Message(None, body))
+        elif messages:
+            messages[-1].text += "\n" + line
+    return messages
+
+
+def _parse_telegram_text(lines: List[str]) -> List[Message]:
+    messages: List[Message] = []
+    for line in lines:
+        match = TELEGRAM_HEADER.match(line)
+        if match:
+            messages.append(Message(match.group(1).strip(), ""))
+        elif messages:
+            messages[-1].text += ("\n" if messages[-1].text else "") + line
+    return messages
+
+
+def _telegram_text(text) -> str:
+    # Rich text is a list of plain strings and {"type": ..., "text": ...} entities
+    if isinstance(text, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in text)
+    return text or ""
+
+
+def _parse_telegram_json(data: dict) -> List[Message]:
+    return [
+        Message(message.get("from"), _telegram_text(message.get("text")))
+        for message in data.get("messages", [])
+        if message.get("type", "message") == "message"
+    ]
+
+
+def _parse_email(lines: List[str]) -> List[Message]:
+    messages: List[Message] = []
+    subject_seen = set()
+    current: Optional[Message] = None
+    in_headers = False
+    skipping = False
+    header_start = 0
+    for line in lines:
+        header = EMAIL_HEADER.match(line)
+        if header and (in_headers or current is None or line.lower().startswith(("from:", "de:"))):
+            if not in_headers:
+                header_start = len(messages)
+            name, value = header.group(1).lower(), header.group(2).strip()
+            if name in ("from", "de"):
+                # "Ana Souza <ana@padaria.com>" -> "Ana Souza"
+                speaker = re.sub(r"\s*<[^>]*>", "", value).strip(' "') or value
+                current = Message(speaker, "")
+                messages.append(current)
+                skipping = False
+            elif name in ("subject", "assunto"):
+                subject = re.sub(r"^((re|fw|fwd|enc|res)\s*:\s*)+", "", value, flags=re.IGNORECASE)
+                if subject and subject.casefold() not in subject_seen:
+                    subject_seen.add(subject.casefold())
+                    # Before the email's sender, not between its body and the
+                    # previous email, where it would split a reply from its question
+                    messages.insert(header_start, Message("Assunto", subject))
+            in_headers = True
+            continue
+        in_headers = False
+        if current is None:
+            current = Message(None, "")
+            messages.append(current)
+        stripped = line.strip()
+        # Quoted history repeats earlier messages of the thread, and
+        # signatures carry no briefing content: skip until the next message
+        if EMAIL_QUOTE_INTRO.match(stripped) or SIGNATURE.match(stripped):
+            skipping = True
+        if skipping or stripped.startswith(">"):
+            continue
+        current.text += ("\n" if current.text else "") + line
+    return messages
+
+
+def _parse_plain(conversation: str) -> List[Message]:
+    messages = []
+    for message in split_messages(conversation):
+        match = SPEAKER.match(message)
+        if match:
+            messages.append(Message(match.group(1).strip(), match.group(2)))
+        else:
+            messages.append(Message(None, message))
+    return messages
+
+
+def parse_conversation(conversation: str) -> Tuple[str, List[Message]]:
+    """Detect the export format and split it into messages."""
+    stripped = conversation.lstrip()
+    if stripped.startswith("{"):
+        try:
+            data = json.loads(stripped)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict) and isinstance(data.get("messages"), list):
+            return "telegram", _parse_telegram_json(data)
+
+    lines = conversation.splitlines()
+    sample = lines[:200]
+    if sum(bool(WHATSAPP_ANDROID.match(line) or WHATSAPP_IOS.match(line)) for line in sample) >= 2:
+        return "whatsapp", _parse_whatsapp(lines)
+    if sum(bool(TELEGRAM_HEADER.match(line)) for line in sample) >= 2:
+        return "telegram", _parse_telegram_text(lines)
+    headers = {match.group(1).lower() for line in sample if (match := EMAIL_HEADER.match(line))}
+    if headers & {"from", "de"} and headers - {"from", "de", "para", "to", "cc"}:
+        return "email", _parse_email(lines)
+    return "plain", _parse_plain(conversation)
+
+
+def _clean(text: str) -> str:
+    text = INLINE_MARKERS.sub(" ", text)
+    return re.sub(r"[ \t]+", " ", re.sub(r"\n\s*\n+", "\n", text)).strip()
+
+
+def _dedupe_key(text: str) -> str:
+    # Accents and emoji are dropped, so "Orçamento 👍" matches "orcamento"
+    text = unicodedata.normalize("NFKD", text.casefold()).encode("ascii", "ignore").decode()
+    return NON_WORD.sub(" ", text).strip()
+
+
+def _is_noise(message: Message, fmt: str) -> bool:
+    if not message.text or not has_content(message.text):
+        return True
+    if NOISE.match(message.text):
+        return True
+    # WhatsApp system lines are the only lines without a speaker there
+    return fmt == "whatsapp" and message.speaker is None and bool(SYSTEM_LINE.search(message.text))
+
+
+def preprocess_conversation(conversation: str, token_budget: Optional[int] = None) -> PreprocessResult:
+    """Compact a chat export before it is put in a prompt.
+
+    Parses WhatsApp, Telegram (text or JSON) and email-thread exports, drops
+    timestamps, app system lines, media placeholders, greetings and thanks,
+    repeated (e.g. forwarded) messages, quoted email history and
+    signatures, and merges consecutive messages of the same speaker into one
+    "Speaker: text" line. Phone-number speakers get short aliases.
+    """
+    fmt, messages = parse_conversation(conversation)
+    aliases = {}
+    seen = set()
+    lines: List[Tuple[Optional[str], str]] = []
+    for message in messages:
+        message.text = _clean(message.text)
+        if _is_noise(message, fmt):
+            continue
+        key = _dedupe_key(message.text)
+        if len(key) >= MIN_DEDUPE_CHARS:
+            if key in seen:
+                continue
+            seen.add(key)
+        speaker = message.speaker
+        if speaker and PHONE.match(speaker):
+            speaker = aliases.setdefault(speaker, f"Contato {len(aliases) + 1}")
+        text = message.text.replace("\n", " / ")
+        if lines and lines[-1][0] == speaker:
+            lines[-1] = (speaker, f"{lines[-1][1]} / {text}")
+        else:
+            lines.append((speaker, text))
+
+    compacted = "\n".join(f"{speaker}: {text}" if speaker else text for speaker, text in lines)
+    if not compacted:
+        # Nothing survived; let the model see the raw text
+        compacted = conversation
+    return PreprocessResult(
+        text=compacted,
+        format=fmt,
+        messages_before=len(messages),
+        messages_after=len(lines),
+        tokens_before=estimate_tokens(conversation),
+        tokens_after=estimate_tokens(compacted),
+        token_budget=token_budget
+    )
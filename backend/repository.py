@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import httpx
+
+from search import SQLiteBriefingSearch, SearchQuery
+
+logger = logging.getLogger("briefing.repository")
+
+# Columns returned for full rows; "*" would also ship the search columns
+FULL_COLUMNS = "id,titulo,conteudo,user_id,created_at"
+
+
+class SupabaseBriefingRepository:
+    """Data access for the `briefings` table through PostgREST, over one
+    pooled, keep-alive async HTTP client shared by every request."""
+
+    def __init__(self, url: str, key: str, pool_size: int = 20, keepalive_expiry: float = 30, timeout: float = 10):
+        self.client = httpx.AsyncClient(
+            base_url=f"{url.rstrip('/')}/rest/v1",
+            headers={"apikey": key, "Authorization": f"Bearer {key}"},
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=timeout
+        )
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def insert_many(self, rows: List[dict]) -> List[dict]:
+        response = await self.client.post(
+            "/briefings",
+            json=rows,
+            params={"select": FULL_COLUMNS},
+            headers={"Prefer": "return=representation"}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def list_page(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[dict]:
+        """Rows of `user_id` ordered by (created_at, id) descending, starting
+        after the `after` keyset. With `fields`, only id, titulo, created_at
+        and those conteudo fields (as top-level keys) are selected."""
+        if fields is None:
+            columns = FULL_COLUMNS
+        else:
+            columns = ",".join(["id", "titulo", "created_at"] + [f"{field}:conteudo->{field}" for field in fields])
+        params = [
+            ("select", columns),
+            ("user_id", f"eq.{user_id}"),
+            ("order", "created_at.desc,id.desc"),
+            ("limit", str(limit))
+        ]
+        if after is not None:
+            created_at, briefing_id = after
+            params.append((
+                "or", f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{briefing_id}))'
+            ))
+        response = await self.client.get("/briefings", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def search(self, query: SearchQuery) -> List[dict]:
+        # search_briefings() is defined in supabase_schema.sql
+        response = await self.client.post("/rpc/search_briefings", json={
+            "p_user_id": query.user_id,
+            "p_query": query.text,
+            "p_orcamento_min": query.orcamento_min,
+            "p_orcamento_max": query.orcamento_max,
+            "p_entrega_from": query.entrega_from.isoformat() if query.entrega_from else None,
+            "p_entrega_to": query.entrega_to.isoformat() if query.entrega_to else None,
+            "p_limit": query.limit
+        })
+        response.raise_for_status()
+        return response.json()
+
+
+class SQLiteBriefingRepository(SQLiteBriefingSearch):
+    """Local stand-in for the Supabase table (BRIEFING_STORE=sqlite), for
+    development and tests. Search comes from the FTS5 index it inherits."""
+
+    async def close(self):
+        pass
+
+    async def insert_many(self, rows: List[dict]) -> List[dict]:
+        created_at = datetime.now(timezone.utc).isoformat()
+        saved = [{"id": str(uuid.uuid4()), "created_at": created_at, **row} for row in rows]
+        await self.index(saved)
+        return saved
+
+    async def list_page(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[dict]:
+        return await asyncio.to_thread(self._list_page, user_id, limit, after, fields)
+
+    def _list_page(self, user_id, limit, after, fields) -> List[dict]:
+        sql = "select id, titulo, conteudo, user_id, created_at from briefings where user_id = ?"
+        params: list = [user_id]
+        if after is not None:
+            sql += " and (created_at < ? or (created_at = ? and id < ?))"
+            params += [after[0], after[0], after[1]]
+        sql += " order by created_at desc, id desc limit ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        result = []
+        for row in rows:
+            conteudo = json.loads(row["conteudo"])
+            if fields is None:
+                result.append({**dict(row), "conteudo": conteudo})
+            else:
+                result.append({
+                    "id": row["id"],
+                    "titulo": row["titulo"],
+                    "created_at": row["created_at"],
+                    **{field: conteudo.get(field) for field in fields}
+                })
+        return result
+
+
+class _PendingWrite:
+    def __init__(self, row: dict):
+        self.row = row
+        self.future = asyncio.get_running_loop().create_future()
+
+
+def _is_rejected(error: Exception) -> bool:
+    """Whether the database refused the rows themselves (a 4xx), as opposed
+    to being unreachable or failing."""
+    return isinstance(error, httpx.HTTPStatusError) and 400 <= error.response.status_code < 500
+
+
+class WriteBehindQueue:
+    """Coalesces single-row inserts issued close together into one bulk
+    insert. Each caller still gets its own saved row (with id and
+    created_at) back, or the error of the bulk insert. When the bulk insert
+    is rejected (a 4xx, e.g. one row with a \\u0000 that jsonb refuses), its
+    rows are inserted one by one, so only the bad row's caller gets the
+    error."""
+
+    def __init__(self, repository, max_batch: int = 50, max_delay: float = 0.02):
+        self.repository = repository
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[_PendingWrite] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._full = asyncio.Event()
+
+    async def insert(self, row: dict) -> dict:
+        write = _PendingWrite(row)
+        self._pending.append(write)
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+        return await write.future
+
+    async def _flush_soon(self):
+        try:
+            await asyncio.wait_for(self._full.wait(), timeout=self.max_delay)
+        except asyncio.TimeoutError:
+            pass
+        await self.flush()
+
+    async def flush(self):
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._full.clear()
+            if len(self._pending) >= self.max_batch:
+                self._full.set()
+            await self._write(batch)
+
+    async def _write(self, batch: List[_PendingWrite]):
+        try:
+            saved = await self.repository.insert_many([write.row for write in batch])
+            if len(saved) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} saved rows, got {len(saved)}")
+        except Exception as e:
+            if len(batch) > 1 and _is_rejected(e):
+                logger.warning("Inserção em lote rejeitada, gravando linha a linha", extra={
+                    "rows": len(batch), "error": str(e)
+                })
+                await asyncio.gather(*(self._write([write]) for write in batch))
+                return
+            logger.warning("Falha na inserção em lote", extra={"rows": len(batch), "error": str(e)})
+            for write in batch:
+                if not write.future.done():
+                    write.future.set_exception(e)
+            return
+        for write, row in zip(batch, saved):
+            if not write.future.done():
+                write.future.set_result(row)
+        if len(batch) > 1:
+            logger.info("Inserções agrupadas", extra={"rows": len(batch)})
+
+    async def close(self):
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush()
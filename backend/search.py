@@ -0,0 +1,129 @@
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional
+
+from parsing import parse_briefing_date
+
+# Text fields of the briefing content covered by keyword search
+SEARCHABLE_FIELDS = ("objetivo", "publico_alvo", "observacoes", "referencias")
+
+
+@dataclass
+class SearchQuery:
+    user_id: str
+    text: Optional[str] = None
+    orcamento_min: Optional[float] = None
+    orcamento_max: Optional[float] = None
+    entrega_from: Optional[date] = None
+    entrega_to: Optional[date] = None
+    limit: int = 20
+
+
+def _fts_query(text: str) -> str:
+    # Quote every word so user input cannot inject FTS5 syntax; a trailing *
+    # makes each word a prefix match ("padar" finds "padaria")
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class SQLiteBriefingSearch:
+    """Local FTS5 implementation of the same search, for development and tests
+    without a Supabase project."""
+
+    def __init__(self, path: str = ":memory:"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript("""
+            create table if not exists briefings (
+                id text primary key,
+                titulo text not null,
+                conteudo text not null,
+                user_id text not null,
+                created_at text not null,
+                orcamento_total real,
+                prazo_entrega text
+            );
+            create index if not exists briefings_user_created_idx on briefings(user_id, created_at desc);
+            create virtual table if not exists briefings_fts using fts5(
+                titulo, objetivo, publico_alvo, observacoes, referencias,
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+        self._conn.commit()
+
+    async def index(self, rows: List[dict]):
+        await asyncio.to_thread(self._index, rows)
+
+    def _index(self, rows: List[dict]):
+        with self._lock:
+            for row in rows:
+                conteudo = row["conteudo"]
+                entrega = parse_briefing_date((conteudo.get("prazos") or {}).get("entrega"))
+                # Upsert keeps the rowid stable, so it can key the FTS row
+                self._conn.execute(
+                    "insert into briefings"
+                    " (id, titulo, conteudo, user_id, created_at, orcamento_total, prazo_entrega)"
+                    " values (?, ?, ?, ?, ?, ?, ?)"
+                    " on conflict (id) do update set titulo = excluded.titulo, conteudo = excluded.conteudo,"
+                    " orcamento_total = excluded.orcamento_total, prazo_entrega = excluded.prazo_entrega",
+                    (
+                        row["id"], row["titulo"], json.dumps(conteudo, ensure_ascii=False), row["user_id"],
+                        row["created_at"], (conteudo.get("orcamento") or {}).get("total"),
+                        entrega.isoformat() if entrega else None
+                    )
+                )
+                rowid = self._conn.execute("select rowid from briefings where id = ?", (row["id"],)).fetchone()[0]
+                texts = [
+                    " ".join(value) if isinstance(value := conteudo.get(field), list) else str(value or "")
+                    for field in SEARCHABLE_FIELDS
+                ]
+                self._conn.execute("delete from briefings_fts where rowid = ?", (rowid,))
+                self._conn.execute(
+                    "insert into briefings_fts (rowid, titulo, objetivo, publico_alvo, observacoes, referencias)"
+                    " values (?, ?, ?, ?, ?, ?)",
+                    (rowid, row["titulo"], *texts)
+                )
+            self._conn.commit()
+
+    async def search(self, query: SearchQuery) -> List[dict]:
+        return await asyncio.to_thread(self._search, query)
+
+    def _search(self, query: SearchQuery) -> List[dict]:
+        conditions = ["b.user_id = ?"]
+        params: list = [query.user_id]
+        source = "briefings b"
+        order = "b.created_at desc"
+        match = _fts_query(query.text) if query.text else ""
+        if match:
+            source = "briefings_fts f join briefings b on b.rowid = f.rowid"
+            conditions.append("briefings_fts match ?")
+            params.append(match)
+            # Title and objective matches weigh more, as in the Postgres ranking
+            order = "bm25(briefings_fts, 4.0, 4.0, 2.0, 1.0, 1.0), b.created_at desc"
+        if query.orcamento_min is not None:
+            conditions.append("b.orcamento_total >= ?")
+            params.append(query.orcamento_min)
+        if query.orcamento_max is not None:
+            conditions.append("b.orcamento_total <= ?")
+            params.append(query.orcamento_max)
+        if query.entrega_from is not None:
+            conditions.append("b.prazo_entrega >= ?")
+            params.append(query.entrega_from.isoformat())
+        if query.entrega_to is not None:
+            conditions.append("b.prazo_entrega <= ?")
+            params.append(query.entrega_to.isoformat())
+        params.append(query.limit)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"select b.id, b.titulo, b.conteudo, b.user_id, b.created_at from {source}"
+                f" where {' and '.join(conditions)} order by {order} limit ?",
+                params
+            ).fetchall()
+        return [{**dict(row), "conteudo": json.loads(row["conteudo"])} for row in rows]
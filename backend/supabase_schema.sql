@@ -1,3 +1,6 @@
+-- Schema for a new database. Existing databases are upgraded by running the
+-- files in migrations/ in order instead.
+
 -- Create briefings table
 create table briefings (
   id uuid default uuid_generate_v4() primary key,
@@ -7,8 +10,9 @@ create table briefings (
   created_at timestamp with time zone default timezone('utc'::text, now()) not null
 );
 
--- Create index for faster user queries
-create index briefings_user_id_idx on briefings(user_id);
+-- Create index for faster user queries; matches the keyset pagination of
+-- GET /briefings/{user_id} (user_id = ? order by created_at desc, id desc)
+create index briefings_user_created_idx on briefings(user_id, created_at desc, id desc);
 
 -- Enable RLS (Row Level Security)
 alter table briefings enable row level security;
@@ -21,4 +25,73 @@ create policy "Users can view their own briefings"
 -- Create policy to allow users to insert their own briefings
 create policy "Users can insert their own briefings"
   on briefings for insert
-  with check (auth.uid()::text = user_id); 
\ No newline at end of file
+  with check (auth.uid()::text = user_id); 
+
+-- Full-text and field search (GET /briefings/{user_id}/search)
+
+-- Best-effort date from a prazo string ("30/04/2025", "2025-04-30", "até 30/04/2025");
+-- null when there is no valid date. Mirrors parse_briefing_date() in parsing.py.
+create or replace function briefing_parse_date(value text) returns date
+language plpgsql immutable as $$
+declare
+  parts text[];
+begin
+  parts := regexp_match(value, '(\d{4})-(\d{2})-(\d{2})');
+  if parts is not null then
+    return make_date(parts[1]::int, parts[2]::int, parts[3]::int);
+  end if;
+  parts := regexp_match(value, '(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})');
+  if parts is not null then
+    return make_date(parts[3]::int, parts[2]::int, parts[1]::int);
+  end if;
+  return null;
+exception when others then
+  return null;
+end;
+$$;
+
+-- Weighted full-text document of a briefing. It is indexed as an expression
+-- rather than stored in a column, so rows read with select * do not carry it.
+create or replace function briefing_search_vector(titulo text, conteudo jsonb) returns tsvector
+language sql immutable as $$
+  select
+    setweight(to_tsvector('portuguese', coalesce(titulo, '')), 'A') ||
+    setweight(to_tsvector('portuguese', coalesce(conteudo->>'objetivo', '')), 'A') ||
+    setweight(to_tsvector('portuguese', coalesce(conteudo->>'publico_alvo', '')), 'B') ||
+    setweight(to_tsvector('portuguese', coalesce(conteudo->'observacoes', '[]'::jsonb)), 'C') ||
+    setweight(to_tsvector('portuguese', coalesce(conteudo->'referencias', '[]'::jsonb)), 'C')
+$$;
+
+alter table briefings
+  add column orcamento_total numeric generated always as ((conteudo->'orcamento'->>'total')::numeric) stored,
+  add column prazo_entrega date generated always as (briefing_parse_date(conteudo->'prazos'->>'entrega')) stored;
+
+create index briefings_search_idx on briefings using gin(briefing_search_vector(titulo, conteudo));
+create index briefings_user_orcamento_idx on briefings(user_id, orcamento_total);
+create index briefings_user_entrega_idx on briefings(user_id, prazo_entrega);
+
+-- Runs with the caller's permissions, so the RLS policies above still apply
+create or replace function search_briefings(
+  p_user_id text,
+  p_query text default null,
+  p_orcamento_min numeric default null,
+  p_orcamento_max numeric default null,
+  p_entrega_from date default null,
+  p_entrega_to date default null,
+  p_limit int default 20
+) returns table (id uuid, titulo text, conteudo jsonb, user_id text, created_at timestamp with time zone)
+language sql stable security invoker as $$
+  select b.id, b.titulo, b.conteudo, b.user_id, b.created_at
+  from briefings b
+  where b.user_id = p_user_id
+    and (coalesce(p_query, '') = '' or briefing_search_vector(b.titulo, b.conteudo) @@ websearch_to_tsquery('portuguese', p_query))
+    and (p_orcamento_min is null or b.orcamento_total >= p_orcamento_min)
+    and (p_orcamento_max is null or b.orcamento_total <= p_orcamento_max)
+    and (p_entrega_from is null or b.prazo_entrega >= p_entrega_from)
+    and (p_entrega_to is null or b.prazo_entrega <= p_entrega_to)
+  order by
+    case when coalesce(p_query, '') = '' then 0
+         else ts_rank(briefing_search_vector(b.titulo, b.conteudo), websearch_to_tsquery('portuguese', p_query)) end desc,
+    b.created_at desc
+  limit least(p_limit, 100);
+$$;
@@ -0,0 +1,56 @@
+"""Tests for batch retries and the shared rate-limit pause (batch.py):
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from batch import Overloaded, is_rate_limited, is_retryable, run_batch  # noqa: E402
+
+
+@pytest.mark.parametrize("error, rate_limited, retryable", [
+    (HTTPException(status_code=429, detail="Model provider rate limit"), True, True),
+    (HTTPException(status_code=503, detail="Model provider error 503"), True, True),
+    (Overloaded("Too many briefings being generated, try again later", 30), False, True),
+    (HTTPException(status_code=502, detail="Model provider rejected the request"), False, False),
+])
+def test_classification(error, rate_limited, retryable):
+    assert is_rate_limited(error) == rate_limited
+    assert is_retryable(error) == retryable
+
+
+async def finish_times(error: Exception) -> dict:
+    """Run 4 items on 2 workers, item 0 failing once with `error`; returns
+    when each item finished, in seconds from the start."""
+    failed = set()
+    started = time.monotonic()
+
+    async def handler(item):
+        if item == 0 and item not in failed:
+            failed.add(item)
+            raise error
+        await asyncio.sleep(0.05)
+        return item
+
+    return {
+        index: time.monotonic() - started
+        async for index, _, _ in run_batch(list(range(4)), handler, workers=2, base_delay=0.01)
+    }
+
+
+def test_local_overload_does_not_pause_the_batch():
+    times = asyncio.run(finish_times(Overloaded("Server overloaded, try again later", 1)))
+    assert max(times[index] for index in (1, 2, 3)) < 0.5
+    assert times[0] >= 1
+
+
+def test_upstream_rate_limit_pauses_the_batch():
+    error = HTTPException(status_code=429, detail="Model provider rate limit", headers={"Retry-After": "1"})
+    times = asyncio.run(finish_times(error))
+    assert max(times[index] for index in (2, 3)) >= 1
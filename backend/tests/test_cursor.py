@@ -0,0 +1,54 @@
+"""Tests for the keyset cursors of GET /briefings/{user_id}:
+
+    python -m pytest tests
+"""
+import base64
+import json
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BRIEFING_STORE", "sqlite")
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("ADMISSION_ENABLED", "0")
+import main  # noqa: E402
+
+CREATED_AT = "2024-01-01T00:00:00+00:00"
+BRIEFING_ID = "5f0c6c3e-8a5e-4a53-9d59-0d2d3c1d0a6b"
+
+
+def encode(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def test_round_trip():
+    assert main.decode_cursor(main.encode_cursor(CREATED_AT, BRIEFING_ID)) == (CREATED_AT, BRIEFING_ID)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    encode(["2024-01-01T00:00:00", 5]),
+    encode([20240101, BRIEFING_ID]),
+    encode([CREATED_AT, None]),
+    encode([CREATED_AT, BRIEFING_ID, "extra"]),
+    encode({"created_at": CREATED_AT, "id": BRIEFING_ID}),
+    encode("2024-01-01T00:00:00"),
+    encode(["yesterday", BRIEFING_ID]),
+    encode([CREATED_AT, "not-a-uuid"]),
+])
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        main.decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_tampered_cursor_answers_400():
+    client = TestClient(main.app)
+    response = client.get("/briefings/u1", params={"cursor": encode(["2024-01-01T00:00:00", 5])})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
@@ -0,0 +1,64 @@
+"""Tests for provider health tracking (llm.py):
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+
+import groq
+import httpx
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm import Completion, Provider  # noqa: E402
+
+REQUEST = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+
+def status_error(status_code: int) -> groq.APIStatusError:
+    response = httpx.Response(status_code, request=REQUEST, json={"error": {"message": "x"}})
+    return groq.APIStatusError("x", response=response, body=None)
+
+
+class FailingProvider(Provider):
+    def __init__(self, error: Exception):
+        super().__init__("fake", "fake-model")
+        self.error = error
+
+    async def _complete(self, prompt: str, json_mode: bool) -> Completion:
+        raise self.error
+
+    async def _stream(self, prompt: str):
+        raise self.error
+        yield
+
+
+def test_provider_is_abstract():
+    with pytest.raises(TypeError):
+        Provider("fake", "fake-model")
+
+
+@pytest.mark.parametrize("error, counted", [
+    (status_error(400), False),
+    (status_error(422), False),
+    (HTTPException(status_code=502, detail="Model provider rejected the request"), False),
+    (status_error(429), True),
+    (status_error(500), True),
+    (groq.APITimeoutError(request=REQUEST), True),
+    (HTTPException(status_code=503, detail="Model provider error 500"), True),
+    (HTTPException(status_code=504, detail="Model response timed out"), True),
+])
+def test_only_provider_failures_are_counted(error, counted):
+    provider = FailingProvider(error)
+
+    async def call():
+        with pytest.raises(type(error)):
+            await provider.complete("prompt")
+        with pytest.raises(type(error)):
+            async for _ in provider.stream("prompt"):
+                pass
+
+    asyncio.run(call())
+    assert provider.stats.failures == (2 if counted else 0)
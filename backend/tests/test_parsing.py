@@ -0,0 +1,110 @@
+"""Unit tests for the briefing parser (parsing.py):
+
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parsing import coerce_briefing, coerce_field, parse_json_object, parse_money  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks", "data", "bad_responses.jsonl")
+BRIEFING = {"objetivo": "x", "publico_alvo": "y", "referencias": ["a"], "observacoes": ["o"]}
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(BRIEFING),
+    "Claro! Segue o briefing:\n" + json.dumps(BRIEFING),
+    json.dumps(BRIEFING) + "\n\nEspero ter ajudado!",
+    "```json\n" + json.dumps(BRIEFING) + "\n```",
+])
+def test_clean_object(text):
+    assert parse_json_object(text) == (BRIEFING, False)
+
+
+@pytest.mark.parametrize("text", [
+    '{"objetivo":"x","publico_alvo":"y"}\nObs: valores {estimados}.',
+    'Segue: {"objetivo":"x","publico_alvo":"y"} e {"nota": 1}',
+])
+def test_prose_with_braces_after_object(text):
+    assert parse_json_object(text) == ({"objetivo": "x", "publico_alvo": "y"}, False)
+
+
+def test_trailing_commas_and_smart_quotes():
+    data, repaired = parse_json_object('{“objetivo”: “x”, "referencias": ["a",],}')
+    assert data == {"objetivo": "x", "referencias": ["a"]}
+    assert repaired
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Cut right after a closing quote, bracket or literal: the member is complete
+    ('{"objetivo":"x","publico_alvo":"y"', {"objetivo": "x", "publico_alvo": "y"}),
+    ('{"objetivo":"x","referencias":["a"],"observacoes":["o"],"publico_alvo":"z"',
+     {"objetivo": "x", "referencias": ["a"], "observacoes": ["o"], "publico_alvo": "z"}),
+    ('{"objetivo":"x","referencias":["a"]', {"objetivo": "x", "referencias": ["a"]}),
+    ('{"objetivo":"x","referencias":["a"],', {"objetivo": "x", "referencias": ["a"]}),
+    ('{"objetivo":"x","ok":true', {"objetivo": "x", "ok": True}),
+    # Cut inside a value: the member is dropped
+    ('{"objetivo":"x","publico_alvo":"y', {"objetivo": "x"}),
+    ('{"objetivo":"x","referencias":["a","b', {"objetivo": "x"}),
+    ('{"objetivo":"x","orcamento":{"total":5', {"objetivo": "x"}),
+    ('{"objetivo":"x","orcamento":50', {"objetivo": "x"}),
+    ('{"objetivo":"x","publico_alvo"', {"objetivo": "x"}),
+    ('{"objetivo":"x","publico_alvo":', {"objetivo": "x"}),
+    ('{"objetivo":"a \\"b\\" c', {}),
+    ("{", {}),
+])
+def test_truncated(text, expected):
+    assert parse_json_object(text) == (expected, True)
+
+
+def test_no_object():
+    assert parse_json_object("Não consegui extrair o briefing.") == (None, False)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (5000, 5000.0),
+    ("R$ 5.000,00", 5000.0),
+    ("R$ 2.500,50", 2500.5),
+    ("5 mil", 5000.0),
+    ("R$ 2,5k", 2500.0),
+    ("a combinar", None),
+    (True, None),
+])
+def test_parse_money(value, expected):
+    assert parse_money(value) == expected
+
+
+@pytest.mark.parametrize("field, value, expected", [
+    ("orcamento", "R$ 5.000,00", {"total": 5000.0}),
+    ("orcamento", {"total": "5 mil", "por_etapa": "a combinar"}, {"total": 5000.0, "por_etapa": 0.0}),
+    ("referencias", "a; b", ["a", "b"]),
+    ("prazos", "2025-04-30", {"entrega": "30/04/2025"}),
+    ("objetivo", ["x", "y"], "x; y"),
+    ("orcamento", "a combinar", None),
+    ("objetivo", "", None),
+    ("extra", "x", None),
+])
+def test_coerce_field(field, value, expected):
+    assert coerce_field(field, value) == expected
+
+
+def test_coerce_reports_missing_fields():
+    result, invalid = coerce_briefing({"objetivo": "x", "orcamento": {"total": "R$ 1.000"}})
+    assert result["objetivo"] == "x"
+    assert result["orcamento"]["total"] == 1000.0
+    assert set(invalid) == {"publico_alvo", "referencias", "prazos", "observacoes"}
+
+
+def test_corpus_parses_or_reports_fields():
+    # Every recorded answer with an object yields data; only no_json does not
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    for case in corpus:
+        data, _ = parse_json_object(case["response"])
+        assert (data is None) == (case["name"] == "no_json"), case["name"]
+        if case["name"].startswith("truncated"):
+            assert data, case["name"]
@@ -0,0 +1,61 @@
+"""Tests for the write-behind queue of briefing saves (repository.py):
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from repository import WriteBehindQueue  # noqa: E402
+
+
+class FakeRepository:
+    """Saves rows like PostgREST, refusing any insert that holds a NUL
+    character with a 400, as jsonb does."""
+
+    def __init__(self, status_code: int = 400):
+        self.status_code = status_code
+        self.inserts = []
+
+    async def insert_many(self, rows):
+        self.inserts.append(len(rows))
+        if any("\u0000" in row["titulo"] for row in rows):
+            request = httpx.Request("POST", "http://supabase/rest/v1/briefings")
+            response = httpx.Response(self.status_code, request=request)
+            raise httpx.HTTPStatusError("rejected", request=request, response=response)
+        return [{"id": str(index), **row} for index, row in enumerate(rows)]
+
+
+async def save_all(repository, titles):
+    writer = WriteBehindQueue(repository, max_batch=10, max_delay=0.01)
+    results = await asyncio.gather(*(writer.insert({"titulo": title}) for title in titles), return_exceptions=True)
+    await writer.close()
+    return results
+
+
+def test_coalesces_inserts():
+    repository = FakeRepository()
+    results = asyncio.run(save_all(repository, ["a", "b", "c"]))
+    assert [row["titulo"] for row in results] == ["a", "b", "c"]
+    assert repository.inserts == [3]
+
+
+def test_rejected_row_fails_only_its_caller():
+    repository = FakeRepository()
+    results = asyncio.run(save_all(repository, ["a", "b\u0000", "c"]))
+    assert results[0]["titulo"] == "a"
+    assert isinstance(results[1], httpx.HTTPStatusError)
+    assert results[2]["titulo"] == "c"
+    assert repository.inserts == [3, 1, 1, 1]
+
+
+def test_server_error_fails_the_whole_batch():
+    # A 5xx says nothing about the rows; retrying each one would only add load
+    repository = FakeRepository(status_code=503)
+    results = asyncio.run(save_all(repository, ["a", "b\u0000"]))
+    assert all(isinstance(result, httpx.HTTPStatusError) for result in results)
+    assert repository.inserts == [2]